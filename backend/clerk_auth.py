@@ -0,0 +1,130 @@
+"""
+Clerk Session Authentication
+Verifies Clerk session JWTs once per request against a cached JWKS
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Dict, Optional
+
+import httpx
+import jwt
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# e.g. https://<your-clerk-domain>/.well-known/jwks.json - verification is skipped when unset
+CLERK_JWKS_URL = os.getenv("CLERK_JWKS_URL")
+CLERK_ISSUER = os.getenv("CLERK_ISSUER")
+
+# Clerk rotates signing keys rarely; refresh in the background instead of on the request path
+JWKS_REFRESH_INTERVAL = 600
+# After a failed fetch the background loop retries on this shorter interval
+JWKS_RETRY_INTERVAL = 30
+# A token with an unknown kid triggers an immediate refetch at most this often, so a flood of
+# forged tokens can't hammer Clerk
+JWKS_MIN_REFETCH_INTERVAL = 30
+
+# Signing keys by kid, swapped wholesale on each refresh
+jwks_keys: Dict[str, jwt.PyJWK] = {}
+# Monotonic time of the last fetch attempt, successful or not
+jwks_last_fetch = 0.0
+# Serializes unknown-kid refetches so concurrent requests share one fetch
+jwks_refetch_lock = asyncio.Lock()
+
+async def refresh_jwks() -> None:
+    """Fetch Clerk's JWKS and replace the cached signing keys"""
+    global jwks_keys, jwks_last_fetch
+    jwks_last_fetch = time.monotonic()
+    async with httpx.AsyncClient(timeout=10.0) as client:
+        response = await client.get(CLERK_JWKS_URL)
+        response.raise_for_status()
+    jwk_set = jwt.PyJWKSet.from_dict(response.json())
+    jwks_keys = {key.key_id: key for key in jwk_set.keys if key.key_id}
+    logger.info("Loaded %d Clerk signing keys", len(jwks_keys))
+
+async def jwks_refresh_loop() -> None:
+    """Keep the JWKS cache fresh for the lifetime of the app, retrying sooner after a failure"""
+    delay = JWKS_REFRESH_INTERVAL if jwks_keys else JWKS_RETRY_INTERVAL
+    while True:
+        await asyncio.sleep(delay)
+        try:
+            await refresh_jwks()
+            delay = JWKS_REFRESH_INTERVAL
+        except Exception as e:
+            logger.warning("Clerk JWKS refresh failed: %s", e)
+            delay = JWKS_RETRY_INTERVAL
+
+async def refetch_jwks_for_unknown_key() -> None:
+    """Refetch the JWKS when a token names a kid we don't have (Clerk rotated its keys, or
+    the startup fetch failed), unless a fetch happened within JWKS_MIN_REFETCH_INTERVAL"""
+    async with jwks_refetch_lock:
+        if time.monotonic() - jwks_last_fetch < JWKS_MIN_REFETCH_INTERVAL:
+            return
+        try:
+            await refresh_jwks()
+        except Exception as e:
+            logger.warning("Clerk JWKS refetch failed: %s", e)
+
+async def verify_session_token(token: str) -> str:
+    """Verify a Clerk session JWT (RS256) and return its subject, the Clerk user ID"""
+    kid = jwt.get_unverified_header(token).get("kid")
+    signing_key = jwks_keys.get(kid)
+    if signing_key is None:
+        await refetch_jwks_for_unknown_key()
+        signing_key = jwks_keys.get(kid)
+    if signing_key is None:
+        raise jwt.InvalidTokenError("Unknown signing key")
+
+    claims = jwt.decode(
+        token,
+        signing_key.key,
+        algorithms=["RS256"],
+        issuer=CLERK_ISSUER,
+        options={"require": ["exp", "sub"], "verify_aud": False, "verify_iss": bool(CLERK_ISSUER)}
+    )
+    return claims["sub"]
+
+async def authenticate(authorization: Optional[bytes]) -> Dict[str, str]:
+    """Resolve an Authorization header to {"clerk_user_id": ...} or {"auth_error": ...}"""
+    if not authorization:
+        return {"auth_error": "Authorization header required"}
+
+    header = authorization.decode("latin-1")
+    if not header.startswith("Bearer "):
+        return {"auth_error": "Invalid authorization format"}
+
+    token = header[7:]  # Remove "Bearer "
+
+    # Development: without a JWKS URL, accept a bare Clerk user ID, or read the subject of the
+    # session token the frontend sends without checking its signature
+    if not CLERK_JWKS_URL:
+        if token.startswith("user_"):
+            return {"clerk_user_id": token}
+        try:
+            return {"clerk_user_id": jwt.decode(token, options={"verify_signature": False})["sub"]}
+        except (jwt.PyJWTError, KeyError):
+            return {"auth_error": "Invalid session token"}
+
+    try:
+        return {"clerk_user_id": await verify_session_token(token)}
+    except jwt.PyJWTError as e:
+        logger.info("Rejected session token: %s", e)
+        return {"auth_error": "Invalid or expired session token"}
+
+class ClerkAuthMiddleware:
+    """
+    Validate the Bearer token once per HTTP request and stash the result on request.state,
+    so every Depends(get_clerk_user_id) in the request reads it instead of re-verifying
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith("/api/user"):
+            authorization = next((value for name, value in scope["headers"] if name == b"authorization"), None)
+            scope.setdefault("state", {}).update(await authenticate(authorization))
+        await self.app(scope, receive, send)
@@ -4,16 +4,68 @@ Handles integration between Clerk authentication and Supabase user management
 """
 
 import os
+import asyncio
 import logging
 from typing import Optional, Dict, Any, List
 from supabase import create_client, Client
-import json
-from datetime import datetime
+import asyncpg
+from pg_utils import record_to_dict
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Optional Redis cache for /api/user/profile bodies (enabled when REDIS_URL is set and redis is installed).
+# It lives here so every write to a user row can invalidate it.
+try:
+    import redis.asyncio as redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+# Profiles change rarely; keep cached copies short-lived as a backstop to invalidation
+PROFILE_CACHE_TTL = 300
+# Invalidation leaves an empty tombstone this long; cache writes are SET NX, so a read that
+# started before the write can't re-cache the old profile over it
+PROFILE_INVALIDATION_TTL = 30
+
+def profile_cache_key(clerk_user_id: str) -> str:
+    return f"user:{clerk_user_id}"
+
+# Monthly interview limits per subscription tier; the free limit is passed to the
+# try_start_interview SQL function, which treats the other tiers as unlimited
+INTERVIEW_LIMITS = {
+    'free': 3,
+    'premium': float('inf'),  # Unlimited
+    'enterprise': float('inf')  # Unlimited
+}
+
+# Direct Postgres reads for the hot user API paths (used once the backend shares its pool)
+SELECT_USER_SQL = "SELECT * FROM users WHERE clerk_user_id = $1"
+
+# Columns served by /api/user/conversations (the ConversationResponse fields)
+CONVERSATION_SUMMARY_COLUMNS = 'id, session_id, mode, status, title, duration, performance_score, difficulty_level, created_at, completed_at'
+
+SELECT_USER_CONVERSATIONS_SQL = """
+    SELECT c.id, c.session_id, c.mode, c.status, c.title, c.duration,
+           c.performance_score::float8 AS performance_score, c.difficulty_level, c.created_at, c.completed_at
+    FROM conversations c
+    JOIN users u ON u.id = c.user_id
+    WHERE u.clerk_user_id = $1
+    ORDER BY c.created_at DESC
+    LIMIT $2
+"""
+
+SELECT_USER_CONVERSATION_STATS_SQL = """
+    SELECT c.status, c.performance_score, c.created_at FROM conversations c
+    JOIN users u ON u.id = c.user_id
+    WHERE u.clerk_user_id = $1
+"""
+
+TRY_START_INTERVIEW_SQL = "SELECT * FROM try_start_interview($1, $2)"
+
 class ClerkUserService:
     def __init__(self):
         """Initialize Supabase client for user management"""
@@ -24,9 +76,64 @@ class ClerkUserService:
             raise ValueError("SUPABASE_URL and SUPABASE_ANON_KEY must be set")
         
         self.supabase: Client = create_client(supabase_url, supabase_key)
+        
+        # Set by the backend once its asyncpg pool is up (SUPABASE_DB_URL); reads fall back to PostgREST
+        self.pg_pool: Optional[asyncpg.Pool] = None
+        
+        # Opened by the backend's lifespan rather than at import, so only serving processes hold a client
+        self.profile_cache = None
         logger.info("ClerkUserService initialized successfully")
 
-    def create_or_update_user(self, clerk_user_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    def open_profile_cache(self):
+        """Create the Redis profile cache client (a no-op without REDIS_URL or redis installed)"""
+        if self.profile_cache is None and REDIS_AVAILABLE and REDIS_URL:
+            self.profile_cache = redis.from_url(REDIS_URL)
+
+    async def close_profile_cache(self):
+        """Close the Redis client's connection pool"""
+        if not self.profile_cache:
+            return
+        profile_cache, self.profile_cache = self.profile_cache, None
+        try:
+            await profile_cache.aclose()
+        except Exception as e:
+            logger.warning("Error closing profile cache: %s", e)
+
+    async def execute(self, query):
+        """Run a PostgREST query's blocking execute() in the default executor so the
+        synchronous Supabase client never stalls the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(None, query.execute)
+
+    async def get_cached_profile(self, clerk_user_id: str) -> Optional[bytes]:
+        """Serialized profile body from the cache, or None (cache disabled, miss, tombstone or error)"""
+        if not self.profile_cache:
+            return None
+        try:
+            return await self.profile_cache.get(profile_cache_key(clerk_user_id)) or None
+        except Exception as e:
+            logger.warning("Profile cache read failed: %s", e)
+            return None
+
+    async def cache_profile(self, clerk_user_id: str, body: bytes):
+        """Store a serialized profile body for PROFILE_CACHE_TTL seconds, unless an entry or an
+        invalidation tombstone is already there"""
+        if not self.profile_cache:
+            return
+        try:
+            await self.profile_cache.set(profile_cache_key(clerk_user_id), body, ex=PROFILE_CACHE_TTL, nx=True)
+        except Exception as e:
+            logger.warning("Profile cache write failed: %s", e)
+
+    async def invalidate_profile(self, clerk_user_id: str):
+        """Replace the cached profile with a tombstone after any write to the user's row"""
+        if not self.profile_cache:
+            return
+        try:
+            await self.profile_cache.set(profile_cache_key(clerk_user_id), b"", ex=PROFILE_INVALIDATION_TTL)
+        except Exception as e:
+            logger.warning("Profile cache invalidation failed: %s", e)
+
+    async def create_or_update_user(self, clerk_user_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """
         Create or update user in Supabase based on Clerk user data
         
@@ -57,28 +164,27 @@ class ClerkUserService:
                 return None
             
             # Check if user already exists
-            existing_user = self.get_user_by_clerk_id(clerk_user_id)
+            existing_user = await self.get_user_by_clerk_id(clerk_user_id)
             
             if existing_user:
-                # Update existing user
-                updated_user = self.update_user(clerk_user_id, {
+                # Update existing user (updated_at is set by the update_users_updated_at trigger)
+                updated_user = await self.update_user(clerk_user_id, {
                     'email': email,
-                    'full_name': full_name,
-                    'updated_at': datetime.utcnow().isoformat()
+                    'full_name': full_name
                 })
-                logger.info(f"Updated user: {clerk_user_id}")
+                logger.info("Updated user: %s", clerk_user_id)
                 return updated_user
             else:
                 # Create new user
-                new_user = self.create_user(clerk_user_id, email, full_name)
-                logger.info(f"Created new user: {clerk_user_id}")
+                new_user = await self.create_user(clerk_user_id, email, full_name)
+                logger.info("Created new user: %s", clerk_user_id)
                 return new_user
                 
         except Exception as e:
-            logger.error(f"Error creating/updating user: {str(e)}")
+            logger.error("Error creating/updating user: %s", e)
             return None
 
-    def create_user(self, clerk_user_id: str, email: str, full_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    async def create_user(self, clerk_user_id: str, email: str, full_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """Create a new user in Supabase"""
         try:
             user_data = {
@@ -91,91 +197,118 @@ class ClerkUserService:
                 'interviews_used_this_month': 0
             }
             
-            result = self.supabase.table('users').insert(user_data).execute()
+            result = await self.execute(self.supabase.table('users').insert(user_data))
             
             if result.data:
                 return result.data[0]
             return None
             
         except Exception as e:
-            logger.error(f"Error creating user: {str(e)}")
+            logger.error("Error creating user: %s", e)
             return None
 
-    def get_user_by_clerk_id(self, clerk_user_id: str) -> Optional[Dict[str, Any]]:
+    async def get_user_by_clerk_id(self, clerk_user_id: str) -> Optional[Dict[str, Any]]:
         """Get user by Clerk user ID"""
         try:
-            result = self.supabase.table('users').select('*').eq('clerk_user_id', clerk_user_id).execute()
+            if self.pg_pool:
+                row = await self.pg_pool.fetchrow(SELECT_USER_SQL, clerk_user_id)
+                return record_to_dict(row) if row else None
+            
+            result = await self.execute(self.supabase.table('users').select('*').eq('clerk_user_id', clerk_user_id))
             
             if result.data:
                 return result.data[0]
             return None
             
         except Exception as e:
-            logger.error(f"Error getting user by Clerk ID: {str(e)}")
+            logger.error("Error getting user by Clerk ID: %s", e)
             return None
 
-    def update_user(self, clerk_user_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    async def update_user(self, clerk_user_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Update user data"""
         try:
-            result = self.supabase.table('users').update(update_data).eq('clerk_user_id', clerk_user_id).execute()
+            result = await self.execute(self.supabase.table('users').update(update_data).eq('clerk_user_id', clerk_user_id))
+            await self.invalidate_profile(clerk_user_id)
             
             if result.data:
                 return result.data[0]
             return None
             
         except Exception as e:
-            logger.error(f"Error updating user: {str(e)}")
+            logger.error("Error updating user: %s", e)
             return None
 
-    def delete_user(self, clerk_user_id: str) -> bool:
+    async def delete_user(self, clerk_user_id: str) -> bool:
         """Delete user and all related data"""
         try:
             # Get user first to get the UUID
-            user = self.get_user_by_clerk_id(clerk_user_id)
+            user = await self.get_user_by_clerk_id(clerk_user_id)
             if not user:
-                logger.warning(f"User not found for deletion: {clerk_user_id}")
+                logger.warning("User not found for deletion: %s", clerk_user_id)
                 return False
             
             # Delete user (CASCADE will handle related data)
-            result = self.supabase.table('users').delete().eq('clerk_user_id', clerk_user_id).execute()
+            result = await self.execute(self.supabase.table('users').delete().eq('clerk_user_id', clerk_user_id))
+            await self.invalidate_profile(clerk_user_id)
             
-            logger.info(f"Deleted user: {clerk_user_id}")
+            logger.info("Deleted user: %s", clerk_user_id)
             return True
             
         except Exception as e:
-            logger.error(f"Error deleting user: {str(e)}")
+            logger.error("Error deleting user: %s", e)
             return False
 
-    def get_user_conversations(self, clerk_user_id: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get user's recent conversations"""
+    async def get_user_conversations(self, clerk_user_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Get user's recent conversations (CONVERSATION_SUMMARY_COLUMNS only)
+        
+        Rows from the Postgres pool keep their UUID/datetime values; serialize them with orjson.
+        """
         try:
-            user = self.get_user_by_clerk_id(clerk_user_id)
+            if self.pg_pool:
+                # Resolve the Clerk ID in the same query instead of a separate user lookup
+                rows = await self.pg_pool.fetch(SELECT_USER_CONVERSATIONS_SQL, clerk_user_id, limit)
+                return [dict(row) for row in rows]
+            
+            user = await self.get_user_by_clerk_id(clerk_user_id)
             if not user:
                 return []
             
-            result = self.supabase.table('conversations').select('*').eq('user_id', user['id']).order('created_at', desc=True).limit(limit).execute()
+            result = await self.execute(self.supabase.table('conversations').select(CONVERSATION_SUMMARY_COLUMNS).eq('user_id', user['id']).order('created_at', desc=True).limit(limit))
             
             return result.data or []
             
         except Exception as e:
-            logger.error(f"Error getting user conversations: {str(e)}")
+            logger.error("Error getting user conversations: %s", e)
             return []
 
-    def get_user_stats(self, clerk_user_id: str) -> Dict[str, Any]:
+    async def get_user_stats(self, clerk_user_id: str) -> Dict[str, Any]:
         """Get user interview statistics"""
         try:
-            user = self.get_user_by_clerk_id(clerk_user_id)
-            if not user:
-                return {}
-            
-            # Get conversation stats
-            conversations = self.supabase.table('conversations').select('status, performance_score, created_at').eq('user_id', user['id']).execute()
+            if self.pg_pool:
+                # Both queries key on the Clerk ID, so the user row and the conversation
+                # stats are fetched concurrently on two pooled connections
+                user, rows = await asyncio.gather(
+                    self.get_user_by_clerk_id(clerk_user_id),
+                    self.pg_pool.fetch(SELECT_USER_CONVERSATION_STATS_SQL, clerk_user_id)
+                )
+                if not user:
+                    return {}
+                conversations = [record_to_dict(row) for row in rows]
+            else:
+                user = await self.get_user_by_clerk_id(clerk_user_id)
+                if not user:
+                    return {}
+                
+                # Get conversation stats
+                result = await self.execute(self.supabase.table('conversations').select('status, performance_score, created_at').eq('user_id', user['id']))
+                conversations = result.data or []
             
-            total_interviews = len(conversations.data) if conversations.data else 0
-            completed_interviews = len([c for c in conversations.data if c['status'] == 'completed']) if conversations.data else 0
+            total_interviews = len(conversations)
+            completed_interviews = len([c for c in conversations if c['status'] == 'completed'])
             
             # Calculate average score for completed interviews
-            completed_scores = [c['performance_score'] for c in conversations.data if c['status'] == 'completed' and c['performance_score'] is not None] if conversations.data else []
+            completed_scores = [c['performance_score'] for c in conversations if c['status'] == 'completed' and c['performance_score'] is not None]
             avg_score = sum(completed_scores) / len(completed_scores) if completed_scores else 0
             
             # Calculate current streak (simplified - could be more sophisticated)
@@ -191,46 +324,20 @@ class ClerkUserService:
             }
             
         except Exception as e:
-            logger.error(f"Error getting user stats: {str(e)}")
+            logger.error("Error getting user stats: %s", e)
             return {}
 
-    def increment_monthly_usage(self, clerk_user_id: str) -> bool:
-        """Increment the user's monthly interview usage"""
-        try:
-            user = self.get_user_by_clerk_id(clerk_user_id)
-            if not user:
-                return False
-            
-            current_usage = user.get('interviews_used_this_month', 0)
-            
-            result = self.supabase.table('users').update({
-                'interviews_used_this_month': current_usage + 1
-            }).eq('clerk_user_id', clerk_user_id).execute()
-            
-            return bool(result.data)
-            
-        except Exception as e:
-            logger.error(f"Error incrementing usage: {str(e)}")
-            return False
-
-    def can_start_interview(self, clerk_user_id: str) -> Dict[str, Any]:
+    async def can_start_interview(self, clerk_user_id: str) -> Dict[str, Any]:
         """Check if user can start a new interview based on subscription limits"""
         try:
-            user = self.get_user_by_clerk_id(clerk_user_id)
+            user = await self.get_user_by_clerk_id(clerk_user_id)
             if not user:
                 return {'can_start': False, 'reason': 'User not found'}
             
             subscription_tier = user.get('subscription_tier', 'free')
             interviews_used = user.get('interviews_used_this_month', 0)
             
-            # Define limits per tier
-            limits = {
-                'free': 3,
-                'premium': float('inf'),  # Unlimited
-                'enterprise': float('inf')  # Unlimited
-            }
-            
-            limit = limits.get(subscription_tier, 3)
+            limit = INTERVIEW_LIMITS.get(subscription_tier, 3)
             
             if interviews_used >= limit:
                 return {
@@ -249,7 +356,49 @@ class ClerkUserService:
             }
             
         except Exception as e:
-            logger.error(f"Error checking interview limit: {str(e)}")
+            logger.error("Error checking interview limit: %s", e)
+            return {'can_start': False, 'reason': 'System error'}
+
+    async def try_start_interview(self, clerk_user_id: str) -> Dict[str, Any]:
+        """
+        Check the monthly limit and count a new interview in one round-trip
+        
+        The try_start_interview SQL function increments usage only while the user is
+        under their tier's limit, so concurrent starts can't overshoot it.
+        
+        Returns:
+            Same shape as can_start_interview; current_usage includes the new interview
+        """
+        try:
+            if self.pg_pool:
+                record = await self.pg_pool.fetchrow(TRY_START_INTERVIEW_SQL, clerk_user_id, INTERVIEW_LIMITS['free'])
+                row = dict(record) if record else None
+            else:
+                result = await self.execute(self.supabase.rpc('try_start_interview', {
+                    'p_clerk_user_id': clerk_user_id,
+                    'p_free_limit': INTERVIEW_LIMITS['free']
+                }))
+                row = result.data[0] if result.data else None
+            
+            if row:
+                # Usage went up, so the cached profile's interviews_used_this_month is stale
+                await self.invalidate_profile(clerk_user_id)
+                subscription_tier = row.get('subscription_tier') or 'free'
+                return {
+                    'can_start': True,
+                    'current_usage': row['interviews_used_this_month'],
+                    'limit': INTERVIEW_LIMITS.get(subscription_tier, 3),
+                    'subscription_tier': subscription_tier
+                }
+            
+            # Nothing was reserved - look up why (user not found or limit reached)
+            limit_check = await self.can_start_interview(clerk_user_id)
+            limit_check['can_start'] = False
+            limit_check.setdefault('reason', 'Cannot start interview')
+            return limit_check
+            
+        except Exception as e:
+            logger.error("Error starting interview: %s", e)
             return {'can_start': False, 'reason': 'System error'}
 
 # Global instance
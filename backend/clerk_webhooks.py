@@ -4,11 +4,11 @@ Handles webhook events from Clerk for user lifecycle management
 """
 
 import os
-import json
+import orjson
 import logging
 from typing import Dict, Any, Optional
 from fastapi import APIRouter, Request, HTTPException, Header
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 import hmac
 import hashlib
 from clerk_user_service import clerk_user_service
@@ -49,7 +49,7 @@ def verify_webhook_signature(payload: bytes, signature: str, secret: str) -> boo
         
         return hmac.compare_digest(expected_signature, signature)
     except Exception as e:
-        logger.error(f"Error verifying webhook signature: {str(e)}")
+        logger.error("Error verifying webhook signature: %s", e)
         return False
 
 @webhook_router.post("/clerk")
@@ -82,16 +82,16 @@ async def handle_clerk_webhook(
         
         # Parse JSON payload
         try:
-            data = json.loads(payload.decode('utf-8'))
-        except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON payload: {str(e)}")
+            data = orjson.loads(payload)
+        except orjson.JSONDecodeError as e:
+            logger.error("Invalid JSON payload: %s", e)
             raise HTTPException(status_code=400, detail="Invalid JSON")
         
         # Get event type and data
         event_type = data.get('type')
         user_data = data.get('data', {})
         
-        logger.info(f"Received Clerk webhook: {event_type}")
+        logger.info("Received Clerk webhook: %s", event_type)
         
         # Handle different event types
         if event_type == 'user.created':
@@ -101,27 +101,27 @@ async def handle_clerk_webhook(
         elif event_type == 'user.deleted':
             result = await handle_user_deleted(user_data)
         else:
-            logger.info(f"Unhandled event type: {event_type}")
+            logger.info("Unhandled event type: %s", event_type)
             result = {"status": "ignored", "event_type": event_type}
         
-        return JSONResponse(content=result)
+        return ORJSONResponse(content=result)
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error processing Clerk webhook: {str(e)}")
+        logger.error("Error processing Clerk webhook: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 async def handle_user_created(user_data: Dict[str, Any]) -> Dict[str, Any]:
     """Handle user creation event from Clerk"""
     try:
-        logger.info(f"Creating user: {user_data.get('id')}")
+        logger.info("Creating user: %s", user_data.get('id'))
         
         # Create user in Supabase
-        user = clerk_user_service.create_or_update_user(user_data)
+        user = await clerk_user_service.create_or_update_user(user_data)
         
         if user:
-            logger.info(f"Successfully created user: {user['clerk_user_id']}")
+            logger.info("Successfully created user: %s", user['clerk_user_id'])
             return {
                 "status": "success",
                 "action": "user_created",
@@ -137,7 +137,7 @@ async def handle_user_created(user_data: Dict[str, Any]) -> Dict[str, Any]:
             }
             
     except Exception as e:
-        logger.error(f"Error handling user creation: {str(e)}")
+        logger.error("Error handling user creation: %s", e)
         return {
             "status": "error",
             "action": "user_created",
@@ -148,13 +148,13 @@ async def handle_user_updated(user_data: Dict[str, Any]) -> Dict[str, Any]:
     """Handle user update event from Clerk"""
     try:
         clerk_user_id = user_data.get('id')
-        logger.info(f"Updating user: {clerk_user_id}")
+        logger.info("Updating user: %s", clerk_user_id)
         
         # Update user in Supabase
-        user = clerk_user_service.create_or_update_user(user_data)
+        user = await clerk_user_service.create_or_update_user(user_data)
         
         if user:
-            logger.info(f"Successfully updated user: {user['clerk_user_id']}")
+            logger.info("Successfully updated user: %s", user['clerk_user_id'])
             return {
                 "status": "success",
                 "action": "user_updated",
@@ -170,7 +170,7 @@ async def handle_user_updated(user_data: Dict[str, Any]) -> Dict[str, Any]:
             }
             
     except Exception as e:
-        logger.error(f"Error handling user update: {str(e)}")
+        logger.error("Error handling user update: %s", e)
         return {
             "status": "error",
             "action": "user_updated",
@@ -181,20 +181,20 @@ async def handle_user_deleted(user_data: Dict[str, Any]) -> Dict[str, Any]:
     """Handle user deletion event from Clerk"""
     try:
         clerk_user_id = user_data.get('id')
-        logger.info(f"Deleting user: {clerk_user_id}")
+        logger.info("Deleting user: %s", clerk_user_id)
         
         # Delete user from Supabase
-        success = clerk_user_service.delete_user(clerk_user_id)
+        success = await clerk_user_service.delete_user(clerk_user_id)
         
         if success:
-            logger.info(f"Successfully deleted user: {clerk_user_id}")
+            logger.info("Successfully deleted user: %s", clerk_user_id)
             return {
                 "status": "success",
                 "action": "user_deleted",
                 "clerk_user_id": clerk_user_id
             }
         else:
-            logger.warning(f"User not found for deletion: {clerk_user_id}")
+            logger.warning("User not found for deletion: %s", clerk_user_id)
             return {
                 "status": "warning",
                 "action": "user_deleted",
@@ -202,7 +202,7 @@ async def handle_user_deleted(user_data: Dict[str, Any]) -> Dict[str, Any]:
             }
             
     except Exception as e:
-        logger.error(f"Error handling user deletion: {str(e)}")
+        logger.error("Error handling user deletion: %s", e)
         return {
             "status": "error",
             "action": "user_deleted",
@@ -0,0 +1,24 @@
+"""
+Postgres Helpers
+Shared by the interview backend and the Clerk user service for direct asyncpg queries
+"""
+
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Any
+
+import asyncpg
+
+def record_to_dict(record: asyncpg.Record) -> Dict[str, Any]:
+    """Convert an asyncpg row to the JSON-friendly shape PostgREST returns"""
+    row = {}
+    for key, value in record.items():
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, uuid.UUID):
+            value = str(value)
+        elif isinstance(value, Decimal):
+            value = float(value)
+        row[key] = value
+    return row
@@ -7,81 +7,301 @@ Integrates Gemini Live API
 
 import os
 import asyncio
-import json
-import base64
-import traceback
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 import uuid
 from datetime import datetime
-from typing import Dict, Any, Optional, List
-import tempfile
-import wave
-import numpy as np
+from typing import Dict, Any, Optional, List, Tuple, Union
 from dotenv import load_dotenv
 from contextlib import asynccontextmanager
 
 # FastAPI and web framework imports
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, BackgroundTasks
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import ORJSONResponse
 import uvicorn
+import orjson
+
+# uvloop is only available on POSIX; fall back to the default asyncio loop elsewhere
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
 
 # Supabase imports
-from supabase import create_client, Client
+from supabase import acreate_client, AsyncClient
+import asyncpg
 
 # Audio and AI imports
-import aiohttp
-import websockets
-from google.genai.types import LiveConnectConfig, Blob
+from websockets.exceptions import ConnectionClosed
 
 # Load environment variables (check parent directory first, then local)
 load_dotenv(dotenv_path="../.env")  # Parent directory
 load_dotenv()  # Local backend/.env (if exists, overrides parent)
 
+# LOG_LEVEL=DEBUG turns on per-turn transcript logging; the default keeps the audio path quiet.
+# An unknown level name falls back to INFO instead of stopping the server at import.
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_LEVEL_VALID = LOG_LEVEL in logging.getLevelNamesMapping()
+# basicConfig is a no-op once the root logger has a handler, so the second import of this
+# module under uvicorn ("simple_supabase_backend:app") leaves logging alone
+logging.basicConfig(level=LOG_LEVEL if LOG_LEVEL_VALID else logging.INFO)
+
+logger = logging.getLogger(__name__)
+if not LOG_LEVEL_VALID:
+    logger.warning("Unknown LOG_LEVEL %r - using INFO", LOG_LEVEL)
+
+def start_log_listener() -> QueueListener:
+    """Put the root handlers behind a QueueHandler so the event loop only enqueues records;
+    the returned listener thread does the formatting and stdout writes"""
+    root = logging.getLogger()
+    log_queue: queue.Queue = queue.Queue(-1)
+    listener = QueueListener(log_queue, *root.handlers, respect_handler_level=True)
+    root.handlers = [QueueHandler(log_queue)]
+    listener.start()
+    return listener
+
+def stop_log_listener(listener: QueueListener):
+    """Flush the queued records and give the root logger its direct handlers back"""
+    listener.stop()
+    logging.getLogger().handlers = list(listener.handlers)
+
+# Dev-only: echo text input back as a fake assistant reply (and store it as a transcript)
+ECHO_TEXT_RESPONSES = os.getenv('ECHO_TEXT_RESPONSES') == '1'
+
 # Gemini imports
 try:
     from google import genai
     from google.genai.types import LiveConnectConfig, Blob
     GEMINI_AVAILABLE = True
 except ImportError:
-    print("❌ Warning: Google Gemini SDK not installed. Install with: pip install google-genai")
+    logger.warning("Google Gemini SDK not installed. Install with: pip install google-genai")
     GEMINI_AVAILABLE = False
 
+from transcript_utils import clean_fragment, is_complete_sentence
+from pg_utils import record_to_dict
+
 # Import Clerk integration modules
 try:
     from clerk_webhooks import webhook_router
     from user_api import user_router
-    from clerk_user_service import ClerkUserService
+    from clerk_user_service import clerk_user_service
+    import clerk_auth
     CLERK_INTEGRATION_AVAILABLE = True
-    print("✅ Clerk integration modules loaded")
+    logger.info("Clerk integration modules loaded")
 except ImportError as e:
-    print(f"❌ Warning: Clerk integration not available: {e}")
+    logger.warning("Clerk integration not available: %s", e)
     CLERK_INTEGRATION_AVAILABLE = False
 
+def error_payload(message: str) -> str:
+    """Serialize a WebSocket error message once so constant errors can be reused as-is"""
+    return orjson.dumps({'type': 'error', 'data': {'message': message}}).decode('utf-8')
+
+# Pre-serialized error payloads for the fixed messages sent from the WebSocket handler
+ERROR_AUTH_REQUIRED = error_payload('User authentication required. Please sign in to start an interview.')
+ERROR_USER_NOT_FOUND = error_payload('User not found in database. Please contact support or try signing in again.')
+ERROR_AI_SESSION_FAILED = error_payload('Failed to create AI session')
+ERROR_AUDIO_FAILED = error_payload('Failed to process audio')
+ERROR_AUDIO_BINARY_ONLY = error_payload('Send audio as binary WebSocket frames of raw 16kHz PCM')
+ERROR_START_FAILED = error_payload('Failed to start interview')
+ERROR_NO_ACTIVE_SESSION = error_payload('No active session found')
+ERROR_BACKEND_INITIALIZING = error_payload('Backend is still initializing, please try again')
+
+# Direct Postgres statements for the hot paths (used when SUPABASE_DB_URL is set)
+SELECT_CONVERSATION_SQL = "SELECT * FROM conversations WHERE session_id = $1"
+
+INSERT_CONVERSATION_SQL = """
+    INSERT INTO conversations (session_id, mode, status, title, user_id)
+    SELECT $1, $2, 'active', $3, u.id FROM users u WHERE u.clerk_user_id = $4
+    RETURNING *
+"""
+
+# Resolves conversation_id and the user UUID (explicit UUID, Clerk ID lookup, or the
+# conversation's owner) inside the INSERT so a transcript write is a single round-trip
+INSERT_TRANSCRIPT_SQL = """
+    INSERT INTO transcripts (conversation_id, session_id, speaker, text, provider, confidence_score, user_id)
+    SELECT c.id, c.session_id, $2::speaker_type, $3, $4, $5::numeric,
+           COALESCE($6::uuid, (SELECT u.id FROM users u WHERE u.clerk_user_id = $7), c.user_id)
+    FROM conversations c
+    WHERE c.session_id = $1
+    RETURNING *
+"""
+
+SELECT_TRANSCRIPTS_SQL = "SELECT * FROM transcripts WHERE session_id = $1 ORDER BY sequence_number LIMIT $2"
+
+UPDATE_CONVERSATION_STATUS_SQL = """
+    UPDATE conversations
+    SET status = $2::text::conversation_status,
+        duration = COALESCE($3::integer, duration),
+        completed_at = CASE WHEN $2::text = 'completed' THEN NOW() ELSE completed_at END
+    WHERE session_id = $1
+    RETURNING *
+"""
+
+DELETE_CONVERSATION_SQL = "DELETE FROM conversations WHERE session_id = $1 RETURNING id"
+
+# Production runs one uvicorn worker per core (at least 2), each with its own asyncpg pool;
+# development runs a single worker so /api/health sees every session
+WORKER_COUNT = max(2, os.cpu_count() or 1) if os.getenv('NODE_ENV') == 'production' else 1
+
+# PG_POOL_MAX_CONNECTIONS is the Postgres connection budget for the whole process tree, so each
+# worker's pool gets an equal share and adding cores never exceeds the database's limit
+PG_POOL_MAX_CONNECTIONS = int(os.getenv('PG_POOL_MAX_CONNECTIONS', '40'))
+PG_POOL_MAX_SIZE = max(2, PG_POOL_MAX_CONNECTIONS // WORKER_COUNT)
+PG_POOL_MIN_SIZE = min(int(os.getenv('PG_POOL_MIN_SIZE', '2')), PG_POOL_MAX_SIZE)
+
+# Background transcript writer: flush when this many rows are queued or after the interval
+TRANSCRIPT_BATCH_SIZE = 64
+TRANSCRIPT_FLUSH_INTERVAL = 0.1
+
+def transcript_params(session_id: str, speaker: str, text: str, provider: str = None, confidence_score: float = None, user_id: str = None) -> Tuple:
+    """Build the INSERT_TRANSCRIPT_SQL arguments. Clerk user IDs start with "user_";
+    anything else is assumed to be a UUID."""
+    is_clerk_id = bool(user_id) and user_id.startswith('user_')
+    return (
+        session_id,
+        speaker,
+        text,
+        provider or 'unknown',
+        confidence_score,
+        None if is_clerk_id else user_id,
+        user_id if is_clerk_id else None
+    )
+
+# Upper bound on the number of queued frames handled together in one batch
+WS_RECEIVE_BATCH_SIZE = 16
+
+# Binary frames are always 16-bit 16kHz mono PCM, so the Gemini MIME type is fixed
+AUDIO_INPUT_MIME_TYPE = "audio/pcm;rate=16000"
+
+# Largest inbound WebSocket frame accepted; microphone chunks are a few KB, so this is
+# generous for audio while refusing the 16 MiB uvicorn default
+WS_MAX_MESSAGE_SIZE = 1024 * 1024
+
+# Gemini audio chunks buffered for a client; when it is full the oldest chunk is dropped so a
+# slow client never holds back the Gemini receive loop (and with it transcript saving)
+AUDIO_OUT_QUEUE_SIZE = 64
+
+# Microphone chunks buffered for Gemini while a send is in flight (several seconds of audio)
+AUDIO_UPLINK_QUEUE_SIZE = 256
+
+# How long audio or a control message may wait for room in a stalled connection's send queue
+SEND_QUEUE_TIMEOUT = 5.0
+
+async def receive_message(websocket: WebSocket) -> Union[Dict, bytes]:
+    """Receive one WebSocket frame. Text frames are JSON decoded with orjson; binary
+    frames carry raw 16kHz PCM and are returned as bytes without any decoding."""
+    message = await websocket.receive()
+    # Audio is nearly all of the traffic, so the binary case is checked first
+    audio = message.get("bytes")
+    if audio is not None:
+        return audio
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000), message.get("reason"))
+    return orjson.loads(message["text"])
+
+async def websocket_reader(websocket: WebSocket, receive_queue: asyncio.Queue):
+    """Read frames into a queue so bursts can be drained and handled as a batch.
+    The exception that ends the connection is queued last so the consumer can re-raise it."""
+    try:
+        while True:
+            await receive_queue.put(await receive_message(websocket))
+    except Exception as e:
+        await receive_queue.put(e)
+
+def coalesce_audio_frames(frames: List[Any]) -> List[Any]:
+    """Merge each run of consecutive binary PCM frames into one audio_data message so a
+    burst costs a single Gemini send. Other messages keep their position in the batch."""
+    messages = []
+    pending_audio: List[bytes] = []
+    for frame in frames:
+        if isinstance(frame, bytes):
+            pending_audio.append(frame)
+            continue
+        if pending_audio:
+            messages.append({'type': 'audio_data', 'data': {'audio': b''.join(pending_audio)}})
+            pending_audio = []
+        messages.append(frame)
+    if pending_audio:
+        messages.append({'type': 'audio_data', 'data': {'audio': b''.join(pending_audio)}})
+    return messages
+
+async def queue_control_message(send_queue: asyncio.Queue, payload: str, session_id: str):
+    """Queue a JSON payload for the writer. Audio can fill the queue, so wait for room like
+    audio does instead of dropping control frames; only a stalled socket loses them."""
+    try:
+        await asyncio.wait_for(send_queue.put(payload), SEND_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning("Send queue stalled for session %s - dropping message", session_id)
+
+async def websocket_writer(websocket: WebSocket, send_queue: asyncio.Queue):
+    """Drain a connection's outbound queue so message handlers never wait on socket writes.
+    This is the only task that writes to the socket: str payloads go out as text frames
+    and bytes (Gemini PCM) as binary frames, in the order they were queued."""
+    try:
+        while True:
+            payload = await send_queue.get()
+            if isinstance(payload, bytes):
+                await websocket.send_bytes(payload)
+            else:
+                await websocket.send_text(payload)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.info("WebSocket writer stopped: %s", e)
+
+# Appended to every mode's system instruction for Gemini Live sessions
+REALTIME_CONVERSATION_RULES = """
+
+IMPORTANT REAL-TIME CONVERSATION RULES:
+1. You MUST respond with AUDIO speech, not text
+2. Listen carefully to what the user says and respond directly to their input
+3. Keep your responses conversational and natural (2-3 sentences max)
+4. Be interactive and responsive - this is a real-time voice conversation
+5. Acknowledge what the user said before asking new questions
+6. Speak clearly and at a normal pace
+7. Keep responses concise to allow for natural turn-taking
+8. Be prepared to be interrupted at any time - this is normal in conversation
+
+Remember: This is a real-time voice conversation with full transcription enabled."""
+
+DEFAULT_SYSTEM_INSTRUCTION = 'You are a helpful AI interviewer.'
+
+def build_live_config(system_instruction: str) -> 'LiveConnectConfig':
+    """Gemini Live config for one interview mode: audio replies with both transcriptions enabled"""
+    return LiveConnectConfig(
+        response_modalities=["AUDIO"],
+        input_audio_transcription={},    # Enable user speech transcription
+        output_audio_transcription={},   # Enable AI speech transcription
+        system_instruction=system_instruction + REALTIME_CONVERSATION_RULES
+    )
+
 class SimpleSupabaseBackend:
     def __init__(self):
         # Environment variables
         self.gemini_api_key = os.getenv('GOOGLE_API_KEY')
         self.supabase_url = os.getenv('SUPABASE_URL')
         self.supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')  # Use service role key to bypass RLS
+        self.database_url = os.getenv('SUPABASE_DB_URL')  # Direct Postgres connection string for the pool
         
-        # Initialize Supabase client
-        if not self.supabase_url or not self.supabase_key:
-            print("❌ SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set in .env file")
-            print("📝 Get these from: https://supabase.com/dashboard/project/[project-id]/settings/api")
-            self.supabase = None
-        else:
-            self.supabase: Client = create_client(self.supabase_url, self.supabase_key)
-            print("✅ Supabase client initialized with Service Role Key (bypasses RLS)")
+        # Supabase client and Postgres pool are created asynchronously in connect_supabase()
+        self.supabase: Optional[AsyncClient] = None
+        self.pg_pool: Optional[asyncpg.Pool] = None
+        
+        # Transcripts waiting to be written in batches by the background writer
+        self.transcript_queue: asyncio.Queue = asyncio.Queue()
+        self.transcript_writer_task: Optional[asyncio.Task] = None
         
         # Initialize Gemini client
         self.gemini_client = None
         if GEMINI_AVAILABLE and self.gemini_api_key and self.gemini_api_key != 'your_google_api_key_here':
             try:
                 self.gemini_client = genai.Client(api_key=self.gemini_api_key)
-                print("✅ Gemini client initialized")
+                logger.info("Gemini client initialized")
             except Exception as e:
-                print(f"❌ Failed to initialize Gemini: {e}")
+                logger.error("Failed to initialize Gemini: %s", e)
         
         # Configuration
         self.model_name = "models/gemini-2.0-flash-live-001"
@@ -91,42 +311,118 @@ class SimpleSupabaseBackend:
         # Active sessions and WebSocket connections
         self.active_sessions: Dict[str, Any] = {}
         self.websocket_connections: Dict[str, WebSocket] = {}
+        self.websocket_send_queues: Dict[str, asyncio.Queue] = {}
         self.gemini_sessions: Dict[str, Any] = {}
         
-        # Audio streaming queues for each session
+        # Audio streaming queues for each session (Gemini -> client, and client -> Gemini)
         self.audio_out_queues: Dict[str, asyncio.Queue] = {}
+        self.audio_in_queues: Dict[str, asyncio.Queue] = {}
+        self.audio_interruptions: Dict[str, int] = {}  # Bumped on each interruption to spot stale audio
         self.audio_streaming_tasks: Dict[str, asyncio.Task] = {}
+        self.background_tasks: set = set()  # Strong refs so fire-and-forget tasks aren't garbage collected
         
-        # Transcript accumulation for complete responses
-        self.transcript_buffers: Dict[str, Dict[str, str]] = {}  # session_id -> {speaker: accumulated_text}
-        
-        # Transcript timing for buffer management
-        self.transcript_timers: Dict[str, Dict[str, Any]] = {}  # session_id -> {speaker: timer_info}
+        # Transcript accumulation for complete responses, with the flush timer for each buffer
+        self.transcript_buffers: Dict[Tuple[str, str], Dict[str, Any]] = {}  # (session_id, speaker) -> {text, timer}
         
-        # Load interview prompts
+        # Load interview prompts and build each mode's Gemini Live config once
+        # (only with the SDK installed; without it there is no client to use them)
         self.prompts = self.load_prompts()
+        self.live_configs: Dict[str, 'LiveConnectConfig'] = {}
+        self.default_live_config: Optional['LiveConnectConfig'] = None
+        if GEMINI_AVAILABLE:
+            self.live_configs = {
+                mode: build_live_config(prompt.get('system_instruction', DEFAULT_SYSTEM_INSTRUCTION))
+                for mode, prompt in self.prompts.items()
+            }
+            self.default_live_config = self.live_configs.get('amazon_interviewer') or build_live_config(DEFAULT_SYSTEM_INSTRUCTION)
+        
+        # Share the user API's Clerk User Service instance (it gets the Postgres pool on connect)
+        self.clerk_user_service = clerk_user_service if CLERK_INTEGRATION_AVAILABLE else None
+        
+        logger.info("Simple Supabase Backend initializing...")
+    
+    async def connect_supabase(self):
+        """Create the async Supabase client. Its PostgREST session is a single pooled
+        HTTP/2 httpx.AsyncClient, so every query reuses the same keep-alive connection."""
+        if not self.supabase_url or not self.supabase_key:
+            logger.error("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set in .env file")
+            logger.error("Get these from: https://supabase.com/dashboard/project/[project-id]/settings/api")
+            return
         
-        # Initialize Clerk User Service if available
-        if CLERK_INTEGRATION_AVAILABLE:
+        try:
+            self.supabase = await acreate_client(self.supabase_url, self.supabase_key)
+            logger.info("Supabase client initialized with Service Role Key (bypasses RLS)")
+        except Exception as e:
+            logger.error("Failed to initialize Supabase: %s", e)
+        
+        logger.info("Supabase: %s", 'Connected' if self.supabase else 'Not configured')
+        
+        # Transcript and conversation hot paths talk to Postgres directly when a DSN is configured
+        if self.database_url:
+            await self.create_pg_pool()
+        else:
+            logger.info("SUPABASE_DB_URL not set - using PostgREST for all queries")
+        
+        # Transcripts are batched either way: executemany on the pool, or multi-row PostgREST inserts
+        if self.pg_pool or self.supabase:
+            self.transcript_writer_task = asyncio.create_task(self.flush_transcripts())
+    
+    async def create_pg_pool(self):
+        """Create the shared asyncpg pool (left as None on failure, so PostgREST is used instead)"""
+        try:
+            self.pg_pool = await asyncpg.create_pool(
+                dsn=self.database_url,
+                min_size=PG_POOL_MIN_SIZE,
+                max_size=PG_POOL_MAX_SIZE,
+                max_inactive_connection_lifetime=300,
+                command_timeout=60,
+                # The hot SQL strings are module constants, so each connection keeps one
+                # server-side prepared statement per query for its whole lifetime
+                statement_cache_size=100,
+                max_cached_statement_lifetime=0,
+                init=self.prepare_connection
+            )
+            logger.info("Postgres connection pool created (%d-%d connections)", PG_POOL_MIN_SIZE, PG_POOL_MAX_SIZE)
+            if self.clerk_user_service:
+                self.clerk_user_service.pg_pool = self.pg_pool
+        except Exception as e:
+            logger.error("Failed to create Postgres connection pool: %s", e)
+    
+    async def prepare_connection(self, connection: asyncpg.Connection):
+        """Pool init hook: prime the connection's statement cache with the transcript history
+        SELECT so the first real query skips parse/plan (LIMIT 0 returns no rows)"""
+        await connection.fetch(SELECT_TRANSCRIPTS_SQL, '', 0)
+    
+    async def close_supabase(self):
+        """Close the Postgres pool and the pooled HTTP connections held by the Supabase client"""
+        if self.transcript_writer_task:
+            # Let the writer drain whatever is still queued before the pool goes away
+            try:
+                await asyncio.wait_for(self.transcript_queue.join(), timeout=5)
+            except asyncio.TimeoutError:
+                logger.warning("Timed out flushing %d queued transcripts", self.transcript_queue.qsize())
+            self.transcript_writer_task.cancel()
+        
+        if self.pg_pool:
             try:
-                self.clerk_user_service = ClerkUserService()
-                print("✅ Clerk User Service initialized")
+                await self.pg_pool.close()
             except Exception as e:
-                print(f"❌ Failed to initialize Clerk User Service: {e}")
-                self.clerk_user_service = None
-        else:
-            self.clerk_user_service = None
+                logger.error("Error closing Postgres pool: %s", e)
         
-        print(f"🐍 Simple Supabase Backend initializing...")
-        print(f"🗄️ Supabase: {'✅ Connected' if self.supabase else '❌ Not configured'}")
+        if not self.supabase:
+            return
+        try:
+            await self.supabase.postgrest.aclose()
+        except Exception as e:
+            logger.error("Error closing Supabase client: %s", e)
         
     def load_prompts(self):
         """Load interview prompts from prompts.json file"""
         try:
-            with open('prompts.json', 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with open('prompts.json', 'rb') as f:
+                return orjson.loads(f.read())
         except FileNotFoundError:
-            print("❌ prompts.json file not found. Using default prompts.")
+            logger.warning("prompts.json file not found. Using default prompts.")
             return {
                 "amazon_interviewer": {
                     "name": "Amazon Technical Interviewer",
@@ -135,23 +431,47 @@ class SimpleSupabaseBackend:
                     "description": "📦 Amazon Interview Mode: Technical + Leadership Principles"
                 }
             }
-        except json.JSONDecodeError as e:
-            print(f"❌ Error parsing prompts.json: {e}")
+        except orjson.JSONDecodeError as e:
+            logger.error("Error parsing prompts.json: %s", e)
             return {}
     
     async def create_conversation(self, session_id: str, mode: str, user_id: str = None):
         """Create a new conversation with optional user association"""
-        if not self.supabase:
-            print(f"❌ Supabase client not available for session {session_id}")
+        if not self.pg_pool and not self.supabase:
+            logger.error("Supabase client not available for session %s", session_id)
             return None
             
         try:
-            print(f"🔍 Creating conversation for session {session_id} with mode {mode}")
+            logger.info("Creating conversation for session %s with mode %s", session_id, mode)
+            
+            if self.pg_pool:
+                title = f"{mode} - {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+                async with self.pg_pool.acquire() as connection:
+                    existing_row = await connection.fetchrow(SELECT_CONVERSATION_SQL, session_id)
+                    if existing_row:
+                        logger.info("Conversation %s already exists", session_id)
+                        return record_to_dict(existing_row)
+                    
+                    if not user_id:
+                        logger.error("No user_id provided")
+                        logger.error("Conversation creation failed - user authentication required")
+                        return None
+                    
+                    # User lookup by Clerk ID happens inside the INSERT
+                    row = await connection.fetchrow(INSERT_CONVERSATION_SQL, session_id, mode, title, user_id)
+                
+                if not row:
+                    logger.error("User not found with Clerk ID: %s", user_id)
+                    logger.error("Conversation creation failed - user must exist in database")
+                    return None
+                
+                logger.info("Created conversation %s in database with ID: %s", session_id, row['id'])
+                return record_to_dict(row)
             
             # Check if conversation already exists
-            existing = self.supabase.table('conversations').select('*').eq('session_id', session_id).execute()
+            existing = await self.supabase.table('conversations').select('*').eq('session_id', session_id).execute()
             if existing.data:
-                print(f"✅ Conversation {session_id} already exists")
+                logger.info("Conversation %s already exists", session_id)
                 return existing.data[0]
             
             # Prepare conversation data
@@ -164,59 +484,63 @@ class SimpleSupabaseBackend:
             
             # Handle user_id if provided (Clerk user ID needs to be converted to UUID)
             if user_id:
-                print(f"🔗 Looking up user with Clerk ID: {user_id}")
+                logger.info("Looking up user with Clerk ID: %s", user_id)
                 
                 # Look up the user by clerk_user_id to get their UUID
-                user_query = self.supabase.table('users').select('id').eq('clerk_user_id', user_id).execute()
+                user_query = await self.supabase.table('users').select('id').eq('clerk_user_id', user_id).execute()
                 
                 if user_query.data:
                     user_uuid = user_query.data[0]['id']
                     conversation_data['user_id'] = user_uuid
-                    print(f"✅ Found user UUID: {user_uuid} for Clerk ID: {user_id}")
+                    logger.info("Found user UUID: %s for Clerk ID: %s", user_uuid, user_id)
                 else:
-                    print(f"❌ User not found with Clerk ID: {user_id}")
-                    print("🚫 Conversation creation failed - user must exist in database")
+                    logger.error("User not found with Clerk ID: %s", user_id)
+                    logger.error("Conversation creation failed - user must exist in database")
                     return None
             else:
-                print("❌ No user_id provided")
-                print("🚫 Conversation creation failed - user authentication required")
+                logger.error("No user_id provided")
+                logger.error("Conversation creation failed - user authentication required")
                 return None
             
-            print(f"📝 Inserting conversation data: {conversation_data}")
+            logger.info("Inserting conversation data: %s", conversation_data)
             
             # Create new conversation
-            result = self.supabase.table('conversations').insert(conversation_data).execute()
+            result = await self.supabase.table('conversations').insert(conversation_data).execute()
             
             if result.data:
-                print(f"✅ Created conversation {session_id} in database with ID: {result.data[0]['id']}")
+                logger.info("Created conversation %s in database with ID: %s", session_id, result.data[0]['id'])
                 
-                # Verify the creation by reading it back
-                verification = self.supabase.table('conversations').select('*').eq('session_id', session_id).execute()
+                # Verify the creation by reading it back (only existence matters, so just the id)
+                verification = await self.supabase.table('conversations').select('id').eq('session_id', session_id).execute()
                 if verification.data:
-                    print(f"✅ Verified conversation exists in database")
+                    logger.info("Verified conversation exists in database")
                 else:
-                    print(f"⚠️ Warning: Conversation created but verification failed")
+                    logger.warning("Conversation created but verification failed")
                 
                 return result.data[0]
             else:
-                print(f"❌ No data returned from conversation creation")
+                logger.error("No data returned from conversation creation")
                 return None
             
         except Exception as e:
-            print(f"❌ Failed to create conversation: {e}")
-            print(f"🔍 Exception type: {type(e)}")
-            import traceback
-            print(f"🔍 Full traceback: {traceback.format_exc()}")
+            logger.exception("Failed to create conversation: %s", e)
             return None
     
     async def add_transcript(self, session_id: str, speaker: str, text: str, provider: str = None, confidence_score: float = None, user_id: str = None):
         """Add a transcript entry with optional user association"""
-        if not self.supabase:
+        if not self.pg_pool and not self.supabase:
             return None
             
         try:
+            if self.pg_pool:
+                row = await self.pg_pool.fetchrow(
+                    INSERT_TRANSCRIPT_SQL,
+                    *transcript_params(session_id, speaker, text, provider, confidence_score, user_id)
+                )
+                return record_to_dict(row) if row else None
+            
             # Get conversation ID from session_id
-            conversation = self.supabase.table('conversations').select('id, user_id').eq('session_id', session_id).execute()
+            conversation = await self.supabase.table('conversations').select('id, user_id').eq('session_id', session_id).execute()
             
             if not conversation.data:
                 return None
@@ -241,7 +565,7 @@ class SimpleSupabaseBackend:
                 # Check if this looks like a Clerk user ID (starts with "user_")
                 if user_id.startswith('user_'):
                     # Look up the user by clerk_user_id to get their UUID
-                    user_query = self.supabase.table('users').select('id').eq('clerk_user_id', user_id).execute()
+                    user_query = await self.supabase.table('users').select('id').eq('clerk_user_id', user_id).execute()
                     
                     if user_query.data:
                         final_user_id = user_query.data[0]['id']
@@ -256,7 +580,7 @@ class SimpleSupabaseBackend:
             if final_user_id:
                 transcript_data['user_id'] = final_user_id
             
-            result = self.supabase.table('transcripts').insert(transcript_data).execute()
+            result = await self.supabase.table('transcripts').insert(transcript_data).execute()
             
             if result.data:
                 return result.data[0]
@@ -264,64 +588,142 @@ class SimpleSupabaseBackend:
                 return None
             
         except Exception as e:
-            print(f"❌ Failed to add transcript: {e}")
+            logger.error("Failed to add transcript: %s", e)
             return None
     
+    async def queue_transcript(self, session_id: str, speaker: str, text: str, provider: str = None, confidence_score: float = None, user_id: str = None):
+        """Queue a transcript entry for the background batch writer (falls back to a direct insert if it isn't running)"""
+        if not self.transcript_writer_task:
+            await self.add_transcript(session_id, speaker, text, provider, confidence_score, user_id=user_id)
+            return
+        
+        self.transcript_queue.put_nowait(transcript_params(session_id, speaker, text, provider, confidence_score, user_id))
+    
+    async def flush_transcripts(self):
+        """Background task: write queued transcripts with executemany, in batches of up to
+        TRANSCRIPT_BATCH_SIZE rows or whatever arrived within TRANSCRIPT_FLUSH_INTERVAL"""
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            batch = [await self.transcript_queue.get()]
+            deadline = loop.time() + TRANSCRIPT_FLUSH_INTERVAL
+            
+            while len(batch) < TRANSCRIPT_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.transcript_queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            try:
+                await self.write_transcript_batch(batch)
+            except Exception as e:
+                # Batches mix every session's rows, so one bad row mustn't cost the others theirs
+                logger.warning("Failed to write %d transcripts (%s) - retrying one at a time", len(batch), e)
+                for params in batch:
+                    try:
+                        await self.write_transcript_batch([params])
+                    except Exception as row_error:
+                        logger.error("Failed to write transcript for session %s: %s", params[0], row_error)
+            finally:
+                for _ in batch:
+                    self.transcript_queue.task_done()
+    
+    async def write_transcript_batch(self, batch: List[Tuple]):
+        """Insert transcript_params rows; raises if any row fails so the caller can retry"""
+        if not self.pg_pool:
+            await self.insert_transcripts_via_postgrest(batch)
+            return
+        
+        # One transaction keeps rows (and their sequence numbers) in queue order
+        async with self.pg_pool.acquire() as connection:
+            async with connection.transaction():
+                await connection.executemany(INSERT_TRANSCRIPT_SQL, batch)
+    
+    async def insert_transcripts_via_postgrest(self, batch: List[Tuple]):
+        """PostgREST version of INSERT_TRANSCRIPT_SQL for a whole batch: one conversation lookup,
+        one Clerk user lookup and a single multi-row insert, however many rows are queued"""
+        session_ids = list({params[0] for params in batch})
+        clerk_user_ids = list({params[6] for params in batch if params[6]})
+        
+        conversation_query = self.supabase.table('conversations').select('id, session_id, user_id').in_('session_id', session_ids).execute()
+        if clerk_user_ids:
+            user_query = self.supabase.table('users').select('id, clerk_user_id').in_('clerk_user_id', clerk_user_ids).execute()
+            conversation_result, user_result = await asyncio.gather(conversation_query, user_query)
+            users = {row['clerk_user_id']: row['id'] for row in user_result.data or []}
+        else:
+            conversation_result = await conversation_query
+            users = {}
+        conversations = {row['session_id']: row for row in conversation_result.data or []}
+        
+        rows = []
+        for session_id, speaker, text, provider, confidence_score, user_uuid, clerk_user_id in batch:
+            conversation = conversations.get(session_id)
+            if not conversation:
+                continue  # Same as the SQL path: no conversation, no row
+            rows.append({
+                'conversation_id': conversation['id'],
+                'session_id': session_id,
+                'speaker': speaker,
+                'text': text,
+                'provider': provider,
+                'confidence_score': confidence_score,
+                # Explicit UUID, then the Clerk ID lookup, then the conversation's owner
+                'user_id': user_uuid or users.get(clerk_user_id) or conversation.get('user_id')
+            })
+        
+        if rows:
+            await self.supabase.table('transcripts').insert(rows).execute()
+    
     async def get_conversation_transcripts(self, session_id: str, limit: int = 100):
         """Get all transcripts for a conversation"""
-        if not self.supabase:
+        if not self.pg_pool and not self.supabase:
             return []
             
         try:
-            result = self.supabase.table('transcripts').select('*').eq('session_id', session_id).order('sequence_number').limit(limit).execute()
+            if self.pg_pool:
+                rows = await self.pg_pool.fetch(SELECT_TRANSCRIPTS_SQL, session_id, limit)
+                return [record_to_dict(row) for row in rows]
+            
+            result = await self.supabase.table('transcripts').select('*').eq('session_id', session_id).order('sequence_number').limit(limit).execute()
             return result.data if result.data else []
         except Exception as e:
-            print(f"❌ Failed to get transcripts: {e}")
+            logger.error("Failed to get transcripts: %s", e)
             return []
     
     async def update_conversation_status(self, session_id: str, status: str, duration: int = None):
         """Update conversation status and duration"""
-        if not self.supabase:
+        if not self.pg_pool and not self.supabase:
             return None
             
         try:
-            update_data = {'status': status, 'updated_at': datetime.now().isoformat()}
+            if self.pg_pool:
+                row = await self.pg_pool.fetchrow(UPDATE_CONVERSATION_STATUS_SQL, session_id, status, duration)
+                return record_to_dict(row) if row else None
+            
+            # updated_at is maintained by the update_conversations_updated_at trigger on both paths
+            update_data = {'status': status}
             if duration is not None:
                 update_data['duration'] = duration
             if status == 'completed':
                 update_data['completed_at'] = datetime.now().isoformat()
             
-            result = self.supabase.table('conversations').update(update_data).eq('session_id', session_id).execute()
+            result = await self.supabase.table('conversations').update(update_data).eq('session_id', session_id).execute()
             return result.data[0] if result.data else None
         except Exception as e:
-            print(f"❌ Failed to update conversation: {e}")
+            logger.error("Failed to update conversation: %s", e)
             return None
     
-    async def create_gemini_session(self, session_id: str, system_instruction: str):
-        """Create a Gemini Live session with audio and transcription enabled"""
+    async def create_gemini_session(self, session_id: str, mode: str):
+        """Create a Gemini Live session with audio and transcription enabled, using the
+        mode's prebuilt config (unknown modes fall back to the Amazon interviewer)"""
         if not self.gemini_client:
             return None
             
         try:
-            # Enhanced configuration with audio and transcription
-            config = LiveConnectConfig(
-                response_modalities=["AUDIO"],
-                input_audio_transcription={},    # Enable user speech transcription
-                output_audio_transcription={},   # Enable AI speech transcription
-                system_instruction=system_instruction + """
-
-IMPORTANT REAL-TIME CONVERSATION RULES:
-1. You MUST respond with AUDIO speech, not text
-2. Listen carefully to what the user says and respond directly to their input
-3. Keep your responses conversational and natural (2-3 sentences max)
-4. Be interactive and responsive - this is a real-time voice conversation
-5. Acknowledge what the user said before asking new questions
-6. Speak clearly and at a normal pace
-7. Keep responses concise to allow for natural turn-taking
-8. Be prepared to be interrupted at any time - this is normal in conversation
-
-Remember: This is a real-time voice conversation with full transcription enabled."""
-            )
+            config = self.live_configs.get(mode, self.default_live_config)
             
             # Create the context manager but don't enter it yet
             session_cm = self.gemini_client.aio.live.connect(
@@ -338,94 +740,104 @@ Remember: This is a real-time voice conversation with full transcription enabled
                 'context_manager': session_cm
             }
             
-            print(f"✅ Created Gemini session with enhanced transcription for {session_id}")
+            logger.info("Created Gemini session with enhanced transcription for %s", session_id)
             return session
             
         except Exception as e:
-            print(f"❌ Failed to create session: {e}")
-            traceback.print_exc()
+            logger.exception("Failed to create session: %s", e)
             return None
     
     async def close_session(self, session_id: str):
         """Close a session and cleanup"""
         # Stop audio streaming tasks
-        if session_id in self.audio_streaming_tasks:
-            task = self.audio_streaming_tasks[session_id]
-            if not task.done():
-                task.cancel()
-                try:
-                    await task
-                except asyncio.CancelledError:
-                    pass
-            del self.audio_streaming_tasks[session_id]
+        task = self.audio_streaming_tasks.pop(session_id, None)
+        if task and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        
+        # Cleanup audio queues
+        queue = self.audio_out_queues.pop(session_id, None)
+        if queue:
+            # Send shutdown signal; if the queue is full the sender is behind, so drop its backlog
+            try:
+                queue.put_nowait(None)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                    queue.task_done()
+                queue.put_nowait(None)
         
-        # Cleanup audio queue
-        if session_id in self.audio_out_queues:
-            queue = self.audio_out_queues[session_id]
-            # Send shutdown signal
-            await queue.put(None)
-            del self.audio_out_queues[session_id]
+        self.audio_interruptions.pop(session_id, None)
+        
+        uplink_queue = self.audio_in_queues.pop(session_id, None)
+        if uplink_queue:
+            # The Gemini session is closed below, so unsent chunks are dropped and the uplink stopped
+            while not uplink_queue.empty():
+                uplink_queue.get_nowait()
+            uplink_queue.put_nowait(None)
         
         # Close Gemini session properly
-        if session_id in self.gemini_sessions:
+        session_info = self.gemini_sessions.pop(session_id, None)
+        if session_info:
             try:
-                session_info = self.gemini_sessions[session_id]
-                context_manager = session_info['context_manager']
-                
                 # Properly exit the context manager
-                await context_manager.__aexit__(None, None, None)
-                
-                del self.gemini_sessions[session_id]
+                await session_info['context_manager'].__aexit__(None, None, None)
             except Exception as e:
-                print(f"❌ Error closing session: {e}")
+                logger.error("Error closing session: %s", e)
         
         # Remove from active sessions
-        if session_id in self.active_sessions:
-            del self.active_sessions[session_id]
-            print(f"✅ Removed session {session_id} from active sessions")
+        if self.active_sessions.pop(session_id, None) is not None:
+            logger.info("Removed session %s from active sessions", session_id)
         
         # Clean up transcript buffers and timers
-        if session_id in self.transcript_buffers:
-            # Cancel any pending timers
-            if session_id in self.transcript_timers:
-                for speaker_timers in self.transcript_timers[session_id].values():
-                    if speaker_timers.get('timer'):
-                        speaker_timers['timer'].cancel()
-                del self.transcript_timers[session_id]
+        for key in [key for key in self.transcript_buffers if key[0] == session_id]:
+            buffer_state = self.transcript_buffers.pop(key)
             
-            # Save any remaining buffered text
-            for speaker, buffered_text in self.transcript_buffers[session_id].items():
-                if buffered_text.strip():
-                    await self.add_transcript(session_id, speaker, buffered_text.strip(), "session_cleanup")
-                    print(f"📝 {speaker.title()}: {buffered_text.strip()}")
+            # Cancel any pending timer
+            if buffer_state['timer']:
+                buffer_state['timer'].cancel()
             
-            del self.transcript_buffers[session_id]
+            # Save any remaining buffered text
+            buffered_text = buffer_state['text'].strip()
+            if buffered_text:
+                speaker = key[1]
+                await self.queue_transcript(session_id, speaker, buffered_text, "session_cleanup")
+                logger.debug("%s: %s", speaker, buffered_text)
         
         # Remove WebSocket connection
-        if session_id in self.websocket_connections:
-            del self.websocket_connections[session_id]
+        self.websocket_connections.pop(session_id, None)
 
     async def start_audio_streaming(self, session_id: str, websocket: WebSocket):
         """Start background audio streaming for a session"""
         if session_id not in self.gemini_sessions:
             return
             
-        # Create audio queue for this session
-        self.audio_out_queues[session_id] = asyncio.Queue()
+        # Create audio queues for this session
+        self.audio_out_queues[session_id] = asyncio.Queue(maxsize=AUDIO_OUT_QUEUE_SIZE)
+        self.audio_in_queues[session_id] = asyncio.Queue(maxsize=AUDIO_UPLINK_QUEUE_SIZE)
         
         # Start background tasks for audio streaming
         receive_task = asyncio.create_task(self.receive_audio_from_gemini(session_id))
         send_task = asyncio.create_task(self.send_audio_to_websocket(session_id, websocket))
+        uplink_task = asyncio.create_task(self.send_audio_to_gemini(session_id))
+        
+        # The senders stop on their queue's None sentinel; keep references until then
+        for task in (send_task, uplink_task):
+            self.background_tasks.add(task)
+            task.add_done_callback(self.background_tasks.discard)
         
         # Store tasks for cleanup
         self.audio_streaming_tasks[session_id] = receive_task
         
     async def receive_audio_from_gemini(self, session_id: str):
         """Continuously receive audio and transcripts from Gemini Live API"""
-        if session_id not in self.gemini_sessions:
+        session_info = self.gemini_sessions.get(session_id)
+        if not session_info:
             return
             
-        session_info = self.gemini_sessions[session_id]
         session = session_info['session']
         
         # Get user_id from active session
@@ -440,56 +852,135 @@ Remember: This is a real-time voice conversation with full transcription enabled
                     # Handle audio data
                     if response.data:
                         # Queue audio data for WebSocket sending
-                        if session_id in self.audio_out_queues:
-                            await self.audio_out_queues[session_id].put(response.data)
+                        audio_queue = self.audio_out_queues.get(session_id)
+                        if audio_queue:
+                            try:
+                                audio_queue.put_nowait(response.data)
+                            except asyncio.QueueFull:
+                                # The client has fallen behind; the oldest audio is the least useful
+                                audio_queue.get_nowait()
+                                audio_queue.task_done()
+                                audio_queue.put_nowait(response.data)
                     
                     # Handle transcripts using official Gemini Live API structure
                     transcript_found = False
                     
-                    # Check for server_content (official API structure)
-                    if hasattr(response, 'server_content') and response.server_content:
-                        server_content = response.server_content
+                    # Check for server_content (official API structure). Each attribute is read
+                    # once with getattr(..., None) instead of hasattr + a second lookup
+                    server_content = getattr(response, 'server_content', None)
+                    if server_content:
+                        # The user barged in; anything Gemini queued before that is stale
+                        if getattr(server_content, 'interrupted', None):
+                            self.clear_audio_out_queue(session_id)
                         
                         # Handle AI output transcription (AI speech-to-text)
-                        if hasattr(server_content, 'output_transcription') and server_content.output_transcription:
-                            if hasattr(server_content.output_transcription, 'text') and server_content.output_transcription.text:
-                                ai_transcript = server_content.output_transcription.text
-                                await self.add_buffered_transcript(session_id, "assistant", ai_transcript, "gemini_live_output_transcription", user_id=user_id)
-                                transcript_found = True
+                        output_transcription = getattr(server_content, 'output_transcription', None)
+                        ai_transcript = getattr(output_transcription, 'text', None)
+                        if ai_transcript:
+                            await self.add_buffered_transcript(session_id, "assistant", ai_transcript, "gemini_live_output_transcription", user_id=user_id)
+                            transcript_found = True
                         
                         # Handle user input transcription (user speech-to-text)
-                        if hasattr(server_content, 'input_transcription') and server_content.input_transcription:
-                            if hasattr(server_content.input_transcription, 'text') and server_content.input_transcription.text:
-                                user_transcript = server_content.input_transcription.text
-                                await self.add_buffered_transcript(session_id, "user", user_transcript, "gemini_live_input_transcription", user_id=user_id)
-                                transcript_found = True
+                        input_transcription = getattr(server_content, 'input_transcription', None)
+                        user_transcript = getattr(input_transcription, 'text', None)
+                        if user_transcript:
+                            await self.add_buffered_transcript(session_id, "user", user_transcript, "gemini_live_input_transcription", user_id=user_id)
+                            transcript_found = True
                         
                         # Handle model turn content (for text responses)
-                        if hasattr(server_content, 'model_turn') and server_content.model_turn:
-                            model_turn = server_content.model_turn
-                            
-                            # Check if model_turn has parts with text
-                            if hasattr(model_turn, 'parts') and model_turn.parts:
-                                for part in model_turn.parts:
-                                    if hasattr(part, 'text') and part.text:
-                                        await self.add_buffered_transcript(session_id, "assistant", part.text, "gemini_live_model_turn", user_id=user_id)
-                                        transcript_found = True
+                        model_turn = getattr(server_content, 'model_turn', None)
+                        for part in getattr(model_turn, 'parts', None) or ():
+                            text = getattr(part, 'text', None)
+                            if text:
+                                await self.add_buffered_transcript(session_id, "assistant", text, "gemini_live_model_turn", user_id=user_id)
+                                transcript_found = True
                     
                     # Fallback: Check direct response.text (legacy support)
                     if not transcript_found and response.text:
                         await self.add_buffered_transcript(session_id, "assistant", response.text, "gemini_live_direct_text", user_id=user_id)
                     
         except Exception as e:
-            print(f"❌ Error receiving audio for session {session_id}: {e}")
-            traceback.print_exc()
+            logger.exception("Error receiving audio for session %s: %s", session_id, e)
+    
+    async def send_audio_to_gemini(self, session_id: str):
+        """Forward microphone audio from the uplink queue to Gemini, so a slow Gemini send
+        never holds up the WebSocket receive loop"""
+        audio_queue = self.audio_in_queues.get(session_id)
+        session_info = self.gemini_sessions.get(session_id)
+        if not audio_queue or not session_info:
+            return
+        
+        session = session_info['session']
+        while True:
+            audio_data = await audio_queue.get()
+            if audio_data is None:  # Shutdown signal
+                break
+            
+            # Anything that queued up while the previous send was in flight goes out together
+            shutdown = False
+            if not audio_queue.empty():
+                chunks = [audio_data]
+                while not audio_queue.empty():
+                    chunk = audio_queue.get_nowait()
+                    if chunk is None:
+                        shutdown = True
+                        break
+                    chunks.append(chunk)
+                audio_data = b''.join(chunks)
+            
+            try:
+                await session.send_realtime_input(
+                    audio=Blob(data=audio_data, mime_type=AUDIO_INPUT_MIME_TYPE)
+                )
+            except Exception as e:
+                logger.error("Error processing audio: %s", e)
+                send_queue = self.websocket_send_queues.get(session_id)
+                if send_queue is not None:
+                    await queue_control_message(send_queue, ERROR_AUDIO_FAILED, session_id)
+            
+            if shutdown:
+                break
+    
+    def clear_audio_out_queue(self, session_id: str):
+        """Drop Gemini audio the client hasn't received yet (on interruption), both what is
+        waiting for the sender and what the sender already handed to the connection's writer.
+        A queued shutdown sentinel is kept so the sender still stops."""
+        self.audio_interruptions[session_id] = self.audio_interruptions.get(session_id, 0) + 1
+        self.drop_queued_socket_audio(session_id)
+        
+        audio_queue = self.audio_out_queues.get(session_id)
+        if not audio_queue:
+            return
+        
+        while not audio_queue.empty():
+            chunk = audio_queue.get_nowait()
+            audio_queue.task_done()
+            if chunk is None:
+                audio_queue.put_nowait(None)
+                break
+    
+    def drop_queued_socket_audio(self, session_id: str):
+        """Remove audio (bytes) payloads from the connection's send queue, keeping JSON
+        messages in order. Runs without awaiting, so nothing can interleave with it."""
+        send_queue = self.websocket_send_queues.get(session_id)
+        if not send_queue:
+            return
+        
+        control_messages = []
+        while not send_queue.empty():
+            payload = send_queue.get_nowait()
+            if not isinstance(payload, bytes):
+                control_messages.append(payload)
+        for payload in control_messages:
+            send_queue.put_nowait(payload)
     
     async def send_audio_to_websocket(self, session_id: str, websocket: WebSocket):
         """Send audio from queue to WebSocket client"""
-        if session_id not in self.audio_out_queues:
+        audio_queue = self.audio_out_queues.get(session_id)
+        if not audio_queue:
             return
-            
-        audio_queue = self.audio_out_queues[session_id]
         
+        stalled = False
         try:
             while True:
                 # Get audio data from queue (wait for it)
@@ -497,69 +988,113 @@ Remember: This is a real-time voice conversation with full transcription enabled
                 
                 if audio_data is None:  # Shutdown signal
                     break
-                    
-                # Convert to base64 and send to WebSocket
-                audio_base64 = base64.b64encode(audio_data).decode('utf-8')
                 
-                await websocket.send_json({
-                    'type': 'audio_response',
-                    'data': {
-                        'audio': audio_base64,
-                        'format': 'pcm',  # Raw PCM audio from Gemini
-                        'sample_rate': 24000,  # Gemini outputs at 24kHz
-                        'channels': 1
-                    }
-                })
+                # Coalesce whatever else Gemini has already queued into the same frame so a
+                # burst of small chunks costs one WebSocket send; a sentinel ends the loop after it
+                shutdown = False
+                if not audio_queue.empty():
+                    chunks = [audio_data]
+                    while not audio_queue.empty():
+                        chunk = audio_queue.get_nowait()
+                        audio_queue.task_done()
+                        if chunk is None:
+                            shutdown = True
+                            break
+                        chunks.append(chunk)
+                    audio_data = b''.join(chunks)
+                    
+                # Raw 24kHz mono PCM goes out as a binary frame; the client treats every
+                # binary frame as audio, so no header or base64 wrapping is needed
+                send_queue = self.websocket_send_queues.get(session_id)
+                if send_queue is None:
+                    await websocket.send_bytes(audio_data)
+                else:
+                    # Audio shares the connection's writer so it never races JSON sends; wait for
+                    # room, but drop this chunk on a stalled socket and keep draining the queue
+                    interruptions = self.audio_interruptions.get(session_id, 0)
+                    try:
+                        await asyncio.wait_for(send_queue.put(audio_data), SEND_QUEUE_TIMEOUT)
+                        # An interruption while this chunk waited for room makes it stale too
+                        if self.audio_interruptions.get(session_id, 0) != interruptions:
+                            self.drop_queued_socket_audio(session_id)
+                        if stalled:
+                            logger.info("Send queue for session %s recovered - resuming audio", session_id)
+                            stalled = False
+                    except asyncio.TimeoutError:
+                        if not stalled:
+                            logger.warning("Send queue stalled for session %s - dropping audio until it drains", session_id)
+                            stalled = True
                 
                 # Mark task as done
                 audio_queue.task_done()
                 
+                if shutdown:
+                    break
+                
         except Exception as e:
-            print(f"❌ Error sending audio to WebSocket for session {session_id}: {e}")
-            traceback.print_exc()
+            logger.exception("Error sending audio to WebSocket for session %s: %s", session_id, e)
 
     async def handle_websocket_message(self, websocket: WebSocket, session_id: str, message: Dict):
-        async def send_if_open(data: Dict):
-            """Helper function to send data only if WebSocket is still open"""
-            try:
-                await websocket.send_json(data)
-            except Exception as e:
-                # Silently ignore WebSocket send errors - this is expected when connection is closed
-                pass
+        send_queue = self.websocket_send_queues.get(session_id)
+        
+        async def send_if_open(data: Union[Dict, str]):
+            """Helper function to hand data to the connection's writer task.
+            Accepts a dict or an already-serialized payload such as the ERROR_* constants."""
+            payload = data if isinstance(data, str) else orjson.dumps(data).decode('utf-8')
+            
+            if send_queue is None:
+                try:
+                    await websocket.send_text(payload)
+                except Exception as e:
+                    # Silently ignore WebSocket send errors - this is expected when connection is closed
+                    pass
+                return
+            
+            await queue_control_message(send_queue, payload, session_id)
         
         try:
             message_type = message.get('type')
             data = message.get('data', {})
             
+            # Resolve per-session state once per frame
+            gemini_session_info = self.gemini_sessions.get(session_id)
+            session_state = self.active_sessions.get(session_id, {})
+            
             if message_type == 'create_session':
                 mode = data.get('mode', 'amazon_interviewer')
                 user_id = data.get('user_id')  # Extract user_id from Clerk frontend
                 
-                print(f"🚀 Creating session {session_id} with mode {mode}")
+                logger.info("Creating session %s with mode %s", session_id, mode)
                 if user_id:
-                    print(f"🔗 User authenticated: {user_id}")
+                    logger.info("User authenticated: %s", user_id)
                 else:
-                    print("❌ No user_id provided - authentication required")
-                
+                    logger.warning("No user_id provided - authentication required")
+
+                # The Gemini Live connection lives for the whole interview; a repeated
+                # create_session reuses it instead of opening (and leaking) a second one
+                if gemini_session_info:
+                    logger.info("Session %s already has a live Gemini connection - reusing it", session_id)
+                    await send_if_open({
+                        'type': 'session_created',
+                        'data': {
+                            'session_id': session_id,
+                            'mode': session_state.get('mode', mode),
+                            'conversation_id': session_state.get('conversation_id')
+                        }
+                    })
+                    return
+
                 # Create conversation in database with user_id
                 conversation = await self.create_conversation(session_id, mode, user_id)
                 
                 if not conversation:
-                    print(f"❌ Failed to create conversation for session {session_id}")
+                    logger.error("Failed to create conversation for session %s", session_id)
                     
                     # Provide specific error message based on whether user_id was provided
-                    if not user_id:
-                        error_message = 'User authentication required. Please sign in to start an interview.'
-                    else:
-                        error_message = 'User not found in database. Please contact support or try signing in again.'
-                    
-                    await send_if_open({
-                        'type': 'error',
-                        'data': {'message': error_message}
-                    })
+                    await send_if_open(ERROR_AUTH_REQUIRED if not user_id else ERROR_USER_NOT_FOUND)
                     return
                 
-                print(f"✅ Conversation created successfully: {conversation['id']}")
+                logger.info("Conversation created successfully: %s", conversation['id'])
                 
                 # Initialize session state
                 self.active_sessions[session_id] = {
@@ -570,17 +1105,11 @@ Remember: This is a real-time voice conversation with full transcription enabled
                 }
                 
                 # Create Gemini session
-                prompt_config = self.prompts.get(mode, self.prompts.get('amazon_interviewer', {}))
-                system_instruction = prompt_config.get('system_instruction', 'You are a helpful AI interviewer.')
-                
-                gemini_session = await self.create_gemini_session(session_id, system_instruction)
+                gemini_session = await self.create_gemini_session(session_id, mode)
                 
                 if not gemini_session:
-                    print(f"❌ Failed to create AI session for {session_id}")
-                    await send_if_open({
-                        'type': 'error',
-                        'data': {'message': 'Failed to create AI session'}
-                    })
+                    logger.error("Failed to create AI session for %s", session_id)
+                    await send_if_open(ERROR_AI_SESSION_FAILED)
                     return
                 
                 # Start audio streaming for this session
@@ -599,42 +1128,37 @@ Remember: This is a real-time voice conversation with full transcription enabled
                 })
             
             elif message_type == 'audio_data':
-                audio_base64 = data.get('audio')
-                if audio_base64 and session_id in self.gemini_sessions:
-                    try:
-                        audio_data = base64.b64decode(audio_base64)
-                        
-                        # Send audio directly to Gemini session (continuous streaming)
-                        session_info = self.gemini_sessions[session_id]
-                        session = session_info['session']
-                        
-                        await session.send_realtime_input(
-                            audio=Blob(data=audio_data, mime_type="audio/pcm;rate=16000")
-                        )
-                        
-                    except Exception as e:
-                        print(f"❌ Error processing audio: {e}")
-                        await send_if_open({
-                            'type': 'error',
-                            'data': {'message': 'Failed to process audio'}
-                        })
+                audio = data.get('audio')
+                if not isinstance(audio, bytes):
+                    # Audio must arrive as binary frames (coalesced into bytes above); JSON
+                    # audio_data with a base64 string is no longer accepted
+                    await send_if_open(ERROR_AUDIO_BINARY_ONLY)
+                elif audio and gemini_session_info:
+                    # Hand off to the session's uplink task (continuous streaming to Gemini)
+                    uplink_queue = self.audio_in_queues.get(session_id)
+                    if uplink_queue is not None:
+                        try:
+                            uplink_queue.put_nowait(audio)
+                        except asyncio.QueueFull:
+                            # Gemini has fallen behind; drop the oldest speech so current speech still goes out
+                            logger.warning("Gemini uplink backed up for session %s - dropping oldest audio", session_id)
+                            uplink_queue.get_nowait()
+                            uplink_queue.put_nowait(audio)
             
             elif message_type == 'start_interview':
                 # User clicked "Start Interview" - now send the initial message to Gemini
-                if session_id in self.gemini_sessions:
+                if gemini_session_info:
                     try:
-                        session_info = self.gemini_sessions[session_id]
-                        session = session_info['session']
+                        session = gemini_session_info['session']
                         
                         # Get the interview mode to customize the initial message
-                        session_state = self.active_sessions.get(session_id, {})
                         mode = session_state.get('mode', 'amazon_interviewer')
                         
                         # Send initial message to start the conversation
                         initial_message = "Hello! I'm ready to start the interview. Please introduce yourself briefly, and then I'll ask you some questions. What's your name and background?"
                         await session.send_realtime_input(text=initial_message)
                         
-                        print(f"🎙️ Interview started for session {session_id} with mode {mode}")
+                        logger.info("Interview started for session %s with mode %s", session_id, mode)
                         
                         await send_if_open({
                             'type': 'interview_started',
@@ -642,66 +1166,61 @@ Remember: This is a real-time voice conversation with full transcription enabled
                         })
                         
                     except Exception as e:
-                        print(f"❌ Error starting interview: {e}")
-                        await send_if_open({
-                            'type': 'error',
-                            'data': {'message': 'Failed to start interview'}
-                        })
+                        logger.error("Error starting interview: %s", e)
+                        await send_if_open(ERROR_START_FAILED)
                 else:
-                    await send_if_open({
-                        'type': 'error',
-                        'data': {'message': 'No active session found'}
-                    })
+                    await send_if_open(ERROR_NO_ACTIVE_SESSION)
             
             elif message_type == 'text_input':
                 text = data.get('text')
                 if text:
                     # Get user_id from session
-                    session_info = self.active_sessions.get(session_id, {})
-                    user_id = session_info.get('user_id')
+                    user_id = session_state.get('user_id')
                     
-                    # Add user message to transcript
-                    await self.add_transcript(session_id, "user", text, "text", user_id=user_id)
+                    if not ECHO_TEXT_RESPONSES:
+                        # Text input isn't sent to Gemini yet - just record what the user typed
+                        await self.queue_transcript(session_id, "user", text, "text", user_id=user_id)
+                        return
                     
-                    # Send to Gemini (convert text to simple prompt)
-                    # For now, just echo back - you can enhance this to actually process with Gemini
+                    # Dev echo: you can enhance this to actually process with Gemini
                     response = f"I received your message: {text}"
-                    await self.add_transcript(session_id, "assistant", response, "gemini", user_id=user_id)
                     
-                    await send_if_open({
-                        'type': 'text_response',
-                        'data': {'text': response}
-                    })
+                    async def save_exchange():
+                        # User row must be written before the reply to keep sequence numbers in order
+                        await self.queue_transcript(session_id, "user", text, "text", user_id=user_id)
+                        await self.queue_transcript(session_id, "assistant", response, "gemini", user_id=user_id)
+                    
+                    # The reply doesn't depend on the transcript writes, so don't wait on them
+                    await asyncio.gather(
+                        send_if_open({
+                            'type': 'text_response',
+                            'data': {'text': response}
+                        }),
+                        save_exchange()
+                    )
+            
+            elif message_type == 'user_interruption':
+                # The client stopped playback to let the user speak; don't send it audio it will discard
+                self.clear_audio_out_queue(session_id)
             
             elif message_type == 'end_session':
-                print(f"🔚 Ending session {session_id} as requested by user")
+                logger.info("Ending session %s as requested by user", session_id)
                 await self.close_session(session_id)
                 
                 # Don't send response - frontend already knows session is ending
                 # and often closes WebSocket connection immediately
-                print(f"✅ Session {session_id} ended successfully")
+                logger.info("Session %s ended successfully", session_id)
             
         except Exception as e:
-            print(f"❌ Error handling message: {e}")
-            traceback.print_exc()
+            logger.exception("Error handling message: %s", e)
             
             # Don't try to send error messages if this is a WebSocket connection error
-            error_str = str(e).lower()
-            error_type = str(type(e)).lower()
-            
-            # Check for various WebSocket connection closed indicators
-            is_websocket_closed = (
-                "connectionclosed" in error_type or
-                "1005" in error_str or
-                "no status received" in error_str or
-                "connection closed" in error_str or
-                "websocket" in error_type
-            )
+            is_websocket_closed = isinstance(e, (WebSocketDisconnect, ConnectionClosed))
             
             if is_websocket_closed:
-                print("🔌 WebSocket connection closed during message handling - skipping error response")
+                logger.info("WebSocket connection closed during message handling - skipping error response")
             else:
-                print("🚨 Non-WebSocket error occurred, attempting to send error response")
+                logger.warning("Non-WebSocket error occurred, attempting to send error response")
                 await send_if_open({
                     'type': 'error',
                     'data': {'message': str(e)}
@@ -709,75 +1228,53 @@ Remember: This is a real-time voice conversation with full transcription enabled
 
     async def add_buffered_transcript(self, session_id: str, speaker: str, text: str, provider: str = None, user_id: str = None):
         """Add transcript with buffering to accumulate partial responses into complete sentences"""
-        if not text or not text.strip():
+        # Clean the text, dropping empty and very short incomplete fragments
+        new_text = clean_fragment(text)
+        if not new_text:
             return
-            
-        # Clean the text
-        new_text = text.strip()
         
-        # Ignore very short fragments (likely incomplete) unless they contain sentence endings
-        if len(new_text) <= 2 and not any(end in new_text for end in ['.', '!', '?']):
-            return
-            
-        # Initialize buffers if needed
-        if session_id not in self.transcript_buffers:
-            self.transcript_buffers[session_id] = {}
-            self.transcript_timers[session_id] = {}
-        
-        if speaker not in self.transcript_buffers[session_id]:
-            self.transcript_buffers[session_id][speaker] = ""
-            self.transcript_timers[session_id][speaker] = {'last_update': datetime.now(), 'timer': None}
+        # Initialize buffer if needed - a single lookup on the flat (session, speaker) key
+        key = (session_id, speaker)
+        buffer_state = self.transcript_buffers.get(key)
+        if buffer_state is None:
+            buffer_state = self.transcript_buffers[key] = {'text': "", 'timer': None}
         
         # APPEND to buffer instead of replacing (Gemini sends incremental 3-char chunks)
-        current_buffer = self.transcript_buffers[session_id][speaker]
-        
         # Smart concatenation - no space needed since Gemini includes them
-        self.transcript_buffers[session_id][speaker] = current_buffer + new_text
-        
-        # Update timing
-        self.transcript_timers[session_id][speaker]['last_update'] = datetime.now()
+        buffer_state['text'] += new_text
         
         # Cancel existing timer
-        if self.transcript_timers[session_id][speaker]['timer']:
-            self.transcript_timers[session_id][speaker]['timer'].cancel()
+        if buffer_state['timer']:
+            buffer_state['timer'].cancel()
         
-        # Get the accumulated text
-        accumulated_text = self.transcript_buffers[session_id][speaker].strip()
+        # Get the accumulated text - the buffer is built only from stripped fragments,
+        # so it never needs re-stripping on every chunk
+        accumulated_text = buffer_state['text']
         
         # Check if we should save immediately (complete sentence indicators)
-        should_save_now = (
-            accumulated_text.endswith('.') or 
-            accumulated_text.endswith('!') or 
-            accumulated_text.endswith('?') or
-            len(accumulated_text) > 300 or  # Save very long responses
-            # Look for complete sentence patterns (sentence + space)
-            '. ' in accumulated_text or '! ' in accumulated_text or '? ' in accumulated_text
-        )
-        
-        if should_save_now:
+        if is_complete_sentence(accumulated_text):
             # Save immediately if we have a complete sentence
             if accumulated_text and len(accumulated_text) > 8:  # Require meaningful length
-                await self.add_transcript(session_id, speaker, accumulated_text, provider, user_id=user_id)
-                print(f"📝 {speaker.title()}: {accumulated_text}")
+                await self.queue_transcript(session_id, speaker, accumulated_text, provider, user_id=user_id)
+                logger.debug("%s: %s", speaker, accumulated_text)
             # Clear the buffer
-            self.transcript_buffers[session_id][speaker] = ""
-            self.transcript_timers[session_id][speaker]['timer'] = None
+            buffer_state['text'] = ""
+            buffer_state['timer'] = None
         else:
             # Set a timer to save after 6 seconds of no updates (longer for complete sentences)
             async def save_buffered():
                 await asyncio.sleep(6)
-                if session_id in self.transcript_buffers and speaker in self.transcript_buffers[session_id]:
-                    buffered_text = self.transcript_buffers[session_id][speaker].strip()
+                # Skip if the session was closed (and its buffer flushed) in the meantime
+                if self.transcript_buffers.get(key) is buffer_state:
+                    buffered_text = buffer_state['text'].strip()
                     if buffered_text and len(buffered_text) > 8:  # Require meaningful length
-                        await self.add_transcript(session_id, speaker, buffered_text, provider, user_id=user_id)
-                        print(f"📝 {speaker.title()}: {buffered_text}")
-                    self.transcript_buffers[session_id][speaker] = ""
-                    if session_id in self.transcript_timers and speaker in self.transcript_timers[session_id]:
-                        self.transcript_timers[session_id][speaker]['timer'] = None
+                        await self.queue_transcript(session_id, speaker, buffered_text, provider, user_id=user_id)
+                        logger.debug("%s: %s", speaker, buffered_text)
+                    buffer_state['text'] = ""
+                    buffer_state['timer'] = None
             
             # Start the timer task
-            timer_task = asyncio.create_task(save_buffered())
-            self.transcript_timers[session_id][speaker]['timer'] = timer_task
+            buffer_state['timer'] = asyncio.create_task(save_buffered())
 
 # Global backend instance (will be initialized in lifespan)
 backend = None
@@ -786,24 +1283,50 @@ backend = None
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     global backend
-    print("🚀 Starting Simple Supabase Backend...")
+    # Started here rather than at import, so the listener and the root QueueHandler belong to
+    # the copy of this module that is actually serving and are both torn down on shutdown
+    log_listener = start_log_listener()
+    logger.info("Starting Simple Supabase Backend...")
     
     # Initialize backend instance after FastAPI starts
     backend = SimpleSupabaseBackend()
+    await backend.connect_supabase()
+    if CLERK_INTEGRATION_AVAILABLE:
+        clerk_user_service.open_profile_cache()
+    
+    # Load Clerk's signing keys up front and keep them fresh off the request path
+    jwks_task = None
+    if CLERK_INTEGRATION_AVAILABLE and clerk_auth.CLERK_JWKS_URL:
+        try:
+            await clerk_auth.refresh_jwks()
+        except Exception as e:
+            logger.error("Failed to load Clerk JWKS: %s", e)
+        jwks_task = asyncio.create_task(clerk_auth.jwks_refresh_loop())
     
     yield
     
-    print("🛑 Shutting down Simple Supabase Backend...")
+    if jwks_task:
+        jwks_task.cancel()
+    
+    logger.info("Shutting down Simple Supabase Backend...")
     # Cleanup any active sessions
     if backend and backend.active_sessions:
         for session_id in list(backend.active_sessions.keys()):
             await backend.close_session(session_id)
+    if backend:
+        await backend.close_supabase()
+    if CLERK_INTEGRATION_AVAILABLE:
+        await clerk_user_service.close_profile_cache()
+    
+    # Flush remaining log records and stop the listener thread
+    stop_log_listener(log_listener)
 
 app = FastAPI(
     title="Coimbatore - Simple Supabase Backend",
     description="FastAPI backend with Supabase (conversations + transcripts only)",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -815,6 +1338,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+async def get_running_backend() -> SimpleSupabaseBackend:
+    """Dependency: the running backend, once startup has created it"""
+    if not backend:
+        raise HTTPException(status_code=503, detail="Backend is still initializing")
+    return backend
+
+async def get_backend(db: SimpleSupabaseBackend = Depends(get_running_backend)) -> SimpleSupabaseBackend:
+    """Dependency: the running backend, once startup has connected Supabase"""
+    if not db.supabase:
+        raise HTTPException(status_code=500, detail="Supabase not configured")
+    return db
+
+async def get_pool(db: SimpleSupabaseBackend = Depends(get_backend)) -> Optional[asyncpg.Pool]:
+    """Dependency: the shared asyncpg pool created in lifespan (None without SUPABASE_DB_URL)"""
+    return db.pg_pool
+
 @app.get("/")
 async def root():
     return {
@@ -838,56 +1377,72 @@ async def health_check():
     }
 
 @app.get("/api/prompts")
-async def get_prompts():
-    if not backend:
-        raise HTTPException(status_code=503, detail="Backend is still initializing")
-    return backend.prompts
+async def get_prompts(db: SimpleSupabaseBackend = Depends(get_running_backend)):
+    # Prompts are loaded from disk, so they are served even without Supabase
+    return db.prompts
 
 @app.websocket("/ws/{session_id}")
 async def websocket_endpoint(websocket: WebSocket, session_id: str):
     await websocket.accept()
     
     if not backend:
-        await websocket.send_json({
-            'type': 'error',
-            'data': {'message': 'Backend is still initializing, please try again'}
-        })
+        await websocket.send_text(ERROR_BACKEND_INITIALIZING)
         await websocket.close()
         return
     
     backend.websocket_connections[session_id] = websocket
     
+    # Outbound messages are written by a dedicated task so handlers never block on socket drain
+    send_queue = asyncio.Queue(maxsize=256)
+    backend.websocket_send_queues[session_id] = send_queue
+    writer_task = asyncio.create_task(websocket_writer(websocket, send_queue))
+    
+    # Inbound frames are read ahead so queued audio bursts can be coalesced
+    receive_queue = asyncio.Queue(maxsize=64)
+    reader_task = asyncio.create_task(websocket_reader(websocket, receive_queue))
+    
     try:
         while True:
-            data = await websocket.receive_json()
-            await backend.handle_websocket_message(websocket, session_id, data)
+            batch = [await receive_queue.get()]
+            while len(batch) < WS_RECEIVE_BATCH_SIZE and not receive_queue.empty():
+                batch.append(receive_queue.get_nowait())
+            
+            for data in coalesce_audio_frames(batch):
+                if isinstance(data, Exception):
+                    raise data
+                await backend.handle_websocket_message(websocket, session_id, data)
     except WebSocketDisconnect:
-        print(f"🔌 WebSocket disconnected for session {session_id}")
+        logger.info("WebSocket disconnected for session %s", session_id)
     except Exception as e:
-        print(f"❌ WebSocket error for session {session_id}: {e}")
+        logger.error("WebSocket error for session %s: %s", session_id, e)
     finally:
+        reader_task.cancel()
+        writer_task.cancel()
         if backend:
+            backend.websocket_send_queues.pop(session_id, None)
             await backend.close_session(session_id)
 
 @app.get("/api/conversations/{session_id}")
-async def get_conversation(session_id: str):
+async def get_conversation(session_id: str,
+                           db: SimpleSupabaseBackend = Depends(get_backend),
+                           pool: Optional[asyncpg.Pool] = Depends(get_pool)):
     """Get conversation details and transcripts"""
-    if not backend:
-        raise HTTPException(status_code=503, detail="Backend is still initializing")
-    if not backend.supabase:
-        raise HTTPException(status_code=500, detail="Supabase not configured")
-    
     try:
         # Get conversation
-        conversation = backend.supabase.table('conversations').select('*').eq('session_id', session_id).execute()
-        if not conversation.data:
+        if pool:
+            row = await pool.fetchrow(SELECT_CONVERSATION_SQL, session_id)
+            conversation = record_to_dict(row) if row else None
+        else:
+            result = await db.supabase.table('conversations').select('*').eq('session_id', session_id).execute()
+            conversation = result.data[0] if result.data else None
+        if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
         
         # Get transcripts
-        transcripts = await backend.get_conversation_transcripts(session_id)
+        transcripts = await db.get_conversation_transcripts(session_id)
         
         return {
-            'conversation': conversation.data[0],
+            'conversation': conversation,
             'transcripts': transcripts
         }
     except HTTPException:
@@ -896,16 +1451,12 @@ async def get_conversation(session_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/transcripts/{session_id}")
-async def get_transcripts(session_id: str, format: str = "json", speaker: str = None):
+async def get_transcripts(session_id: str, format: str = "json", speaker: str = None,
+                          db: SimpleSupabaseBackend = Depends(get_backend)):
     """Get transcripts for a session with optional formatting and filtering"""
-    if not backend:
-        raise HTTPException(status_code=503, detail="Backend is still initializing")
-    if not backend.supabase:
-        raise HTTPException(status_code=500, detail="Supabase not configured")
-    
     try:
         # Get transcripts
-        transcripts = await backend.get_conversation_transcripts(session_id)
+        transcripts = await db.get_conversation_transcripts(session_id)
         
         if not transcripts:
             # Return empty array instead of 404 for sessions with no transcripts
@@ -917,13 +1468,11 @@ async def get_transcripts(session_id: str, format: str = "json", speaker: str =
         
         # Format response based on requested format
         if format == "text":
-            # Return as readable text format
-            formatted_text = ""
-            for transcript in transcripts:
-                speaker_name = transcript.get('speaker', 'Unknown')
-                text = transcript.get('text', '')
-                timestamp = transcript.get('created_at', '')
-                formatted_text += f"[{timestamp}] {speaker_name}: {text}\n\n"
+            # Return as readable text format (joined in one pass instead of repeated +=)
+            formatted_text = "\n\n".join(
+                f"[{transcript.get('created_at', '')}] {transcript.get('speaker', 'Unknown')}: {transcript.get('text', '')}"
+                for transcript in transcripts
+            )
             
             return {"format": "text", "content": formatted_text.strip()}
         
@@ -950,36 +1499,32 @@ async def get_transcripts(session_id: str, format: str = "json", speaker: str =
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/conversations")
-async def list_conversations():
+async def list_conversations(db: SimpleSupabaseBackend = Depends(get_backend)):
     """List all conversations"""
-    if not backend:
-        raise HTTPException(status_code=503, detail="Backend is still initializing")
-    if not backend.supabase:
-        raise HTTPException(status_code=500, detail="Supabase not configured")
-    
     try:
-        result = backend.supabase.table('conversations').select('*').order('created_at', desc=True).execute()
+        result = await db.supabase.table('conversations').select('*').order('created_at', desc=True).execute()
         return result.data if result.data else []
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/api/conversations/{session_id}")
-async def delete_conversation(session_id: str):
+async def delete_conversation(session_id: str,
+                              db: SimpleSupabaseBackend = Depends(get_backend),
+                              pool: Optional[asyncpg.Pool] = Depends(get_pool)):
     """Delete a conversation and all its transcripts"""
-    if not backend:
-        raise HTTPException(status_code=503, detail="Backend is still initializing")
-    if not backend.supabase:
-        raise HTTPException(status_code=500, detail="Supabase not configured")
-    
     try:
         # Close active session if running
-        if session_id in backend.active_sessions:
-            await backend.close_session(session_id)
+        if session_id in db.active_sessions:
+            await db.close_session(session_id)
         
         # Delete from database (transcripts will be deleted automatically due to CASCADE)
-        result = backend.supabase.table('conversations').delete().eq('session_id', session_id).execute()
+        if pool:
+            deleted = await pool.fetchval(DELETE_CONVERSATION_SQL, session_id)
+        else:
+            result = await db.supabase.table('conversations').delete().eq('session_id', session_id).execute()
+            deleted = result.data
         
-        if not result.data:
+        if not deleted:
             raise HTTPException(status_code=404, detail="Conversation not found")
         
         return {"message": "Conversation deleted successfully"}
@@ -989,16 +1534,9 @@ async def delete_conversation(session_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/test/create-sample-data")
-async def create_sample_data():
+async def create_sample_data(db: SimpleSupabaseBackend = Depends(get_backend)):
     """Create sample conversation and transcript data for testing"""
-    if not backend:
-        raise HTTPException(status_code=503, detail="Backend is still initializing")
-    if not backend.supabase:
-        raise HTTPException(status_code=500, detail="Supabase not configured")
-    
     try:
-        import uuid
-        
         # Create test session ID
         test_session_id = f"session_demo_{uuid.uuid4().hex[:6]}"
         
@@ -1014,7 +1552,7 @@ async def create_sample_data():
         }
         
         # Insert conversation
-        conv_result = backend.supabase.table("conversations").insert(conversation_data).execute()
+        conv_result = await db.supabase.table("conversations").insert(conversation_data).execute()
         
         if conv_result.data:
             # Create test transcripts
@@ -1065,7 +1603,7 @@ async def create_sample_data():
             
             # Insert transcripts
             for transcript in test_transcripts:
-                backend.supabase.table("transcripts").insert(transcript).execute()
+                await db.supabase.table("transcripts").insert(transcript).execute()
             
             return {
                 "message": "Sample data created successfully",
@@ -1081,44 +1619,41 @@ async def create_sample_data():
         raise HTTPException(status_code=500, detail=f"Error creating sample data: {str(e)}")
 
 @app.get("/api/test/list-sessions")
-async def list_sessions():
+async def list_sessions(db: SimpleSupabaseBackend = Depends(get_backend)):
     """List all available session IDs for testing"""
-    if not backend:
-        raise HTTPException(status_code=503, detail="Backend is still initializing")
-    if not backend.supabase:
-        raise HTTPException(status_code=500, detail="Supabase not configured")
-    
     try:
         # Get active sessions
-        active_sessions = list(backend.active_sessions.keys()) if hasattr(backend, 'active_sessions') else []
+        active_sessions = list(db.active_sessions)
         
-        # Get sessions from database
-        db_sessions = []
-        try:
-            result = backend.supabase.table("conversations").select("session_id, mode, status, created_at").limit(20).execute()
-            if result.data:
-                db_sessions = [
+        async def fetch_db_sessions():
+            """Get sessions from database"""
+            try:
+                result = await db.supabase.table("conversations").select("session_id, mode, status, created_at").limit(20).execute()
+                return [
                     {
                         "session_id": row["session_id"],
                         "mode": row["mode"],
                         "status": row["status"],
                         "created_at": row["created_at"]
                     }
-                    for row in result.data
+                    for row in result.data or []
                 ]
-        except Exception as db_error:
-            print(f"Database query error: {db_error}")
+            except Exception as db_error:
+                logger.error("Database query error: %s", db_error)
+                return []
         
-        # Get sessions that have transcripts
-        transcript_sessions = []
-        try:
-            transcript_result = backend.supabase.table("transcripts").select("session_id").limit(50).execute()
-            if transcript_result.data:
-                # Get unique session IDs
-                unique_sessions = list(set([row["session_id"] for row in transcript_result.data if row["session_id"]]))
-                transcript_sessions = unique_sessions
-        except Exception as transcript_error:
-            print(f"Transcript query error: {transcript_error}")
+        async def fetch_transcript_sessions():
+            """Get sessions that have transcripts"""
+            try:
+                # Deduplicated in Postgres so we only receive each session ID once
+                transcript_result = await db.supabase.rpc("distinct_transcript_sessions").execute()
+                return [row["session_id"] for row in transcript_result.data or []]
+            except Exception as transcript_error:
+                logger.error("Transcript query error: %s", transcript_error)
+                return []
+        
+        # The two queries are independent, so run them concurrently
+        db_sessions, transcript_sessions = await asyncio.gather(fetch_db_sessions(), fetch_transcript_sessions())
         
         return {
             "active_sessions": active_sessions,
@@ -1141,9 +1676,29 @@ async def list_sessions():
 if CLERK_INTEGRATION_AVAILABLE:
     app.include_router(webhook_router)
     app.include_router(user_router)
-    print("✅ Clerk authentication routers added")
+    app.add_middleware(clerk_auth.ClerkAuthMiddleware)
+    logger.info("Clerk authentication routers added")
 else:
-    print("⚠️ Clerk integration not available - user authentication disabled")
+    logger.warning("Clerk integration not available - user authentication disabled")
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=3000) 
\ No newline at end of file
+    if UVLOOP_AVAILABLE:
+        uvloop.install()
+    # Each WebSocket session lives entirely in the worker that accepted it, so production can
+    # fan out across cores (see WORKER_COUNT). The import string makes uvicorn (and each
+    # worker) import this module again; import-time code therefore only builds cheap,
+    # connection-free objects, and the log listener, Redis client, Supabase/Postgres
+    # connections and Clerk JWKS are all set up in lifespan
+    uvicorn.run(
+        "simple_supabase_backend:app",
+        host="0.0.0.0",
+        port=3000,
+        loop="uvloop" if UVLOOP_AVAILABLE else "asyncio",
+        http="httptools",
+        ws="websockets",
+        # PCM audio doesn't compress, so permessage-deflate would only burn CPU on every frame
+        ws_per_message_deflate=False,
+        ws_max_size=WS_MAX_MESSAGE_SIZE,
+        workers=WORKER_COUNT,
+        log_level="warning"
+    )
@@ -55,6 +55,8 @@ CREATE INDEX idx_conversations_user_id ON conversations(user_id);
 CREATE INDEX idx_conversations_session_id ON conversations(session_id);
 CREATE INDEX idx_conversations_status ON conversations(status);
 CREATE INDEX idx_conversations_created_at ON conversations(created_at DESC);
+-- Serves a user's most recent conversations (/api/user/conversations) as an ordered index prefix
+CREATE INDEX idx_conversations_user_created ON conversations(user_id, created_at DESC);
 
 -- =============================================
 -- TRANSCRIPTS TABLE (Updated with user_id)
@@ -198,6 +200,25 @@ $$ language 'plpgsql';
 CREATE TRIGGER set_transcript_sequence BEFORE INSERT ON transcripts
     FOR EACH ROW EXECUTE FUNCTION set_transcript_sequence_number();
 
+-- Distinct session IDs that have transcripts (deduplicated server-side)
+CREATE OR REPLACE FUNCTION distinct_transcript_sessions()
+RETURNS TABLE (session_id VARCHAR) AS $$
+    SELECT DISTINCT t.session_id FROM transcripts t WHERE t.session_id IS NOT NULL;
+$$ LANGUAGE sql STABLE;
+
+-- Atomically reserve one interview against the monthly limit. The free-tier limit is passed in
+-- by the backend (INTERVIEW_LIMITS in clerk_user_service.py); paid tiers are unlimited.
+-- Returns the new usage, or no row when the user doesn't exist or is already at the limit.
+DROP FUNCTION IF EXISTS try_start_interview(VARCHAR);
+CREATE OR REPLACE FUNCTION try_start_interview(p_clerk_user_id VARCHAR, p_free_limit INTEGER)
+RETURNS TABLE (interviews_used_this_month INTEGER, subscription_tier subscription_tier) AS $$
+    UPDATE users u
+    SET interviews_used_this_month = COALESCE(u.interviews_used_this_month, 0) + 1
+    WHERE u.clerk_user_id = p_clerk_user_id
+      AND (COALESCE(u.subscription_tier, 'free') <> 'free' OR COALESCE(u.interviews_used_this_month, 0) < p_free_limit)
+    RETURNING u.interviews_used_this_month, u.subscription_tier;
+$$ LANGUAGE sql;
+
 -- =============================================
 -- SAMPLE DATA (for testing)
 -- =============================================
@@ -27,7 +27,7 @@ def main():
     # Check all users in database
     print("\n📋 All users in database:")
     try:
-        users = supabase.table('users').select('clerk_user_id, email, full_name').execute()
+        users = supabase.table('users').select('clerk_user_id, email, full_name').limit(1000).execute()
         
         if users.data:
             for i, user in enumerate(users.data, 1):
@@ -46,7 +46,7 @@ def main():
     print(f"\n🔍 Testing specific Clerk ID: {test_clerk_id}")
     
     try:
-        user_query = supabase.table('users').select('*').eq('clerk_user_id', test_clerk_id).execute()
+        user_query = supabase.table('users').select('id, email, full_name, clerk_user_id').eq('clerk_user_id', test_clerk_id).limit(1).execute()
         
         if user_query.data:
             user = user_query.data[0]
@@ -0,0 +1,40 @@
+"""
+Transcript Buffering Helpers
+Pure string checks run on every streamed transcript fragment
+
+Kept free of async code and backend state so the module can be compiled with
+mypyc (`mypyc transcript_utils.py`); the compiled extension is picked up by the
+normal import automatically and this file is used as-is otherwise.
+"""
+
+from typing import Optional
+
+# Characters that terminate a sentence in streamed transcript fragments
+SENTENCE_ENDINGS = frozenset('.!?')
+
+# Flush the buffer once it grows past this many characters, even mid-sentence
+MAX_BUFFERED_CHARS = 300
+
+def clean_fragment(text: Optional[str]) -> Optional[str]:
+    """Strip a streamed fragment, returning None if it should be ignored"""
+    if not text:
+        return None
+    
+    new_text = text.strip()
+    if not new_text:
+        return None
+    
+    # Ignore very short fragments (likely incomplete) unless they end a sentence
+    if len(new_text) <= 2 and new_text[-1] not in SENTENCE_ENDINGS:
+        return None
+    
+    return new_text
+
+def is_complete_sentence(accumulated_text: str) -> bool:
+    """Check whether the buffered text should be saved immediately"""
+    return (
+        accumulated_text[-1:] in SENTENCE_ENDINGS or
+        len(accumulated_text) > MAX_BUFFERED_CHARS or  # Save very long responses
+        # Look for complete sentence patterns (sentence + space)
+        '. ' in accumulated_text or '! ' in accumulated_text or '? ' in accumulated_text
+    )
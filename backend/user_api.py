@@ -3,23 +3,54 @@ User API Endpoints
 Provides authenticated user endpoints for the frontend
 """
 
+import hashlib
 import logging
-from typing import Dict, Any, List, Optional
-from fastapi import APIRouter, HTTPException, Header, Depends
-from pydantic import BaseModel
+from typing import List, Literal, Optional
+import orjson
+from fastapi import APIRouter, HTTPException, Header, Depends, Request, Response, Query
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, field_validator
 from clerk_user_service import clerk_user_service
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Stats are per-user and only move when an interview finishes, so a short private browser cache is safe
+STATS_CACHE_CONTROL = "private, max-age=30"
+
+def etag_json_response(body: bytes, if_none_match: Optional[str], cache_control: Optional[str] = None) -> Response:
+    """Send a JSON body with a strong ETag, or an empty 304 if the client already has it.
+    Bodies are per-user, so caches must key them on the Authorization header too."""
+    etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+    headers = {"ETag": etag, "Vary": "Authorization"}
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+    if if_none_match and etag in (tag.strip().removeprefix('W/') for tag in if_none_match.split(',')):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 # Create router for user endpoints
 user_router = APIRouter(prefix="/api/user", tags=["user"])
 
+# Values of the experience_level and subscription_tier enums in supabase_schema_with_users.sql
+ExperienceLevel = Literal['entry', 'junior', 'mid', 'senior', 'staff', 'principal']
+SubscriptionTier = Literal['free', 'premium', 'enterprise']
+
 # Pydantic models for request/response
 class UserProfile(BaseModel):
-    experience_level: Optional[str] = None
+    # The enum fields may be omitted but not sent as null or "", so bad values get a 422
+    # here instead of failing the database update
+    experience_level: Optional[ExperienceLevel] = None
     target_companies: Optional[List[str]] = None
-    subscription_tier: Optional[str] = None
+    subscription_tier: Optional[SubscriptionTier] = None
+
+    @field_validator('experience_level', 'subscription_tier')
+    @classmethod
+    def reject_null(cls, value):
+        # Only runs for values the client sent; the None default is not validated
+        if value is None:
+            raise ValueError('may be omitted but not null')
+        return value
 
 class UserStats(BaseModel):
     total_interviews: int
@@ -41,40 +72,38 @@ class ConversationResponse(BaseModel):
     created_at: str
     completed_at: Optional[str]
 
-def get_clerk_user_id(authorization: Optional[str] = Header(None)) -> str:
+def get_clerk_user_id(request: Request) -> str:
     """
-    Extract Clerk user ID from Authorization header
-    
-    In a production app, you would validate the JWT token here.
-    For development, we'll accept a simple format like "Bearer user_xxx"
+    Clerk user ID resolved by ClerkAuthMiddleware
+
+    The middleware verifies the Clerk session JWT once per request (without CLERK_JWKS_URL,
+    for development, it skips the signature check and also accepts a bare "Bearer user_xxx"),
+    so this just reads request.state
     """
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Authorization header required")
-    
-    if not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Invalid authorization format")
-    
-    # Extract user ID (in production, this would be from JWT validation)
-    token = authorization[7:]  # Remove "Bearer "
-    
-    # For development, accept format like "user_xxx" or actual JWT
-    if token.startswith("user_"):
-        return token
-    
-    # TODO: In production, validate JWT and extract user ID
-    # For now, just return the token as user ID
-    return token
+    clerk_user_id = getattr(request.state, "clerk_user_id", None)
+    if not clerk_user_id:
+        detail = getattr(request.state, "auth_error", "Authorization header required")
+        raise HTTPException(status_code=401, detail=detail)
+    return clerk_user_id
 
-@user_router.get("/profile")
-async def get_user_profile(clerk_user_id: str = Depends(get_clerk_user_id)) -> Dict[str, Any]:
-    """Get user profile information"""
+@user_router.get("/profile", response_model=None)
+async def get_user_profile(
+    clerk_user_id: str = Depends(get_clerk_user_id),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Get user profile information (returned as a Response so FastAPI skips its encoder)"""
     try:
-        user = clerk_user_service.get_user_by_clerk_id(clerk_user_id)
+        # Serve the cached JSON body as-is when we have one (the service invalidates it on writes)
+        cached = await clerk_user_service.get_cached_profile(clerk_user_id)
+        if cached:
+            return etag_json_response(cached, if_none_match)
+        
+        user = await clerk_user_service.get_user_by_clerk_id(clerk_user_id)
         
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        return {
+        profile = {
             "id": user["id"],
             "clerk_user_id": user["clerk_user_id"],
             "email": user["email"],
@@ -86,38 +115,36 @@ async def get_user_profile(clerk_user_id: str = Depends(get_clerk_user_id)) -> D
             "created_at": user["created_at"],
             "updated_at": user["updated_at"]
         }
+        body = orjson.dumps(profile)
+        await clerk_user_service.cache_profile(clerk_user_id, body)
+        
+        return etag_json_response(body, if_none_match)
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error getting user profile: {str(e)}")
+        logger.error("Error getting user profile: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
-@user_router.put("/profile")
+@user_router.put("/profile", response_model=None)
 async def update_user_profile(
     profile_data: UserProfile,
     clerk_user_id: str = Depends(get_clerk_user_id)
-) -> Dict[str, Any]:
+) -> Response:
     """Update user profile information"""
     try:
-        # Prepare update data
-        update_data = {}
-        if profile_data.experience_level:
-            update_data["experience_level"] = profile_data.experience_level
-        if profile_data.target_companies is not None:
-            update_data["target_companies"] = profile_data.target_companies
-        if profile_data.subscription_tier:
-            update_data["subscription_tier"] = profile_data.subscription_tier
-        
+        # Only the fields the client actually sent (explicit nulls and empty values included)
+        update_data = profile_data.model_dump(exclude_unset=True)
+
         if not update_data:
             raise HTTPException(status_code=400, detail="No data to update")
         
-        user = clerk_user_service.update_user(clerk_user_id, update_data)
+        user = await clerk_user_service.update_user(clerk_user_id, update_data)
         
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        return {
+        return ORJSONResponse({
             "status": "success",
             "message": "Profile updated successfully",
             "user": {
@@ -126,83 +153,82 @@ async def update_user_profile(
                 "target_companies": user["target_companies"],
                 "subscription_tier": user["subscription_tier"]
             }
-        }
+        })
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error updating user profile: {str(e)}")
+        logger.error("Error updating user profile: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
-@user_router.get("/stats")
-async def get_user_stats(clerk_user_id: str = Depends(get_clerk_user_id)) -> UserStats:
-    """Get user interview statistics"""
+@user_router.get("/stats", response_model=None)
+async def get_user_stats(
+    clerk_user_id: str = Depends(get_clerk_user_id),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Get user interview statistics. The service already returns well-typed values, so the
+    model is built without validation and serialized straight to the response body."""
     try:
-        stats = clerk_user_service.get_user_stats(clerk_user_id)
+        stats = await clerk_user_service.get_user_stats(clerk_user_id)
         
         if not stats:
             # Return default stats for new users
-            return UserStats(
-                total_interviews=0,
-                completed_interviews=0,
-                average_score=0.0,
-                current_streak=0,
-                subscription_tier="free",
-                interviews_used_this_month=0
-            )
+            stats = {
+                'total_interviews': 0,
+                'completed_interviews': 0,
+                'average_score': 0.0,
+                'current_streak': 0,
+                'subscription_tier': "free",
+                'interviews_used_this_month': 0
+            }
         
-        return UserStats(**stats)
+        body = UserStats.model_construct(**stats).model_dump_json().encode()
+        # Let the browser reuse stats for repeat dashboard visits; after that the ETag gives a 304
+        return etag_json_response(body, if_none_match, cache_control=STATS_CACHE_CONTROL)
         
     except Exception as e:
-        logger.error(f"Error getting user stats: {str(e)}")
+        logger.error("Error getting user stats: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
-@user_router.get("/conversations")
+@user_router.get(
+    "/conversations",
+    response_model=None,
+    # Documents the schema in OpenAPI without validating or re-encoding each row at runtime
+    responses={200: {"model": List[ConversationResponse]}}
+)
 async def get_user_conversations(
-    limit: int = 10,
+    limit: int = Query(10, ge=1, le=100),
     clerk_user_id: str = Depends(get_clerk_user_id)
-) -> List[ConversationResponse]:
-    """Get user's recent conversations"""
+):
+    """Get user's recent conversations in the ConversationResponse shape"""
     try:
-        conversations = clerk_user_service.get_user_conversations(clerk_user_id, limit)
+        conversations = await clerk_user_service.get_user_conversations(clerk_user_id, limit)
         
-        return [
-            ConversationResponse(
-                id=str(conv["id"]),
-                session_id=conv["session_id"],
-                mode=conv["mode"],
-                status=conv["status"],
-                title=conv["title"],
-                duration=conv["duration"],
-                performance_score=conv["performance_score"],
-                difficulty_level=conv["difficulty_level"],
-                created_at=conv["created_at"],
-                completed_at=conv["completed_at"]
-            )
-            for conv in conversations
-        ]
+        # The service selects exactly the response fields, so rows are serialized as-is in
+        # one orjson pass (UUIDs and datetimes are handled natively)
+        return Response(content=orjson.dumps(conversations), media_type="application/json")
         
     except Exception as e:
-        logger.error(f"Error getting user conversations: {str(e)}")
+        logger.error("Error getting user conversations: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
-@user_router.post("/check-interview-limit")
-async def check_interview_limit(clerk_user_id: str = Depends(get_clerk_user_id)) -> Dict[str, Any]:
+@user_router.post("/check-interview-limit", response_model=None)
+async def check_interview_limit(clerk_user_id: str = Depends(get_clerk_user_id)) -> Response:
     """Check if user can start a new interview"""
     try:
-        result = clerk_user_service.can_start_interview(clerk_user_id)
-        return result
+        result = await clerk_user_service.can_start_interview(clerk_user_id)
+        return ORJSONResponse(result)
         
     except Exception as e:
-        logger.error(f"Error checking interview limit: {str(e)}")
+        logger.error("Error checking interview limit: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
-@user_router.post("/start-interview")
-async def start_interview(clerk_user_id: str = Depends(get_clerk_user_id)) -> Dict[str, Any]:
+@user_router.post("/start-interview", response_model=None)
+async def start_interview(clerk_user_id: str = Depends(get_clerk_user_id)) -> Response:
     """Start a new interview and increment usage"""
     try:
-        # Check if user can start interview
-        limit_check = clerk_user_service.can_start_interview(clerk_user_id)
+        # Check the limit and increment usage in a single atomic database call
+        limit_check = await clerk_user_service.try_start_interview(clerk_user_id)
         
         if not limit_check.get('can_start', False):
             raise HTTPException(
@@ -213,43 +239,45 @@ async def start_interview(clerk_user_id: str = Depends(get_clerk_user_id)) -> Di
                 }
             )
         
-        # Increment usage
-        success = clerk_user_service.increment_monthly_usage(clerk_user_id)
-        
-        if not success:
-            raise HTTPException(status_code=500, detail="Failed to update usage")
-        
-        return {
+        return ORJSONResponse({
             "status": "success",
             "message": "Interview started successfully",
             "usage_info": {
-                "current_usage": limit_check.get('current_usage', 0) + 1,
+                "current_usage": limit_check.get('current_usage', 0),
                 "limit": limit_check.get('limit'),
                 "subscription_tier": limit_check.get('subscription_tier')
             }
-        }
+        })
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error starting interview: {str(e)}")
+        logger.error("Error starting interview: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
-@user_router.post("/create-user")
+@user_router.post("/create-user", response_model=None)
 async def create_user_manually(
-    clerk_user_data: Dict[str, Any],
+    request: Request,
     authorization: Optional[str] = Header(None)
-) -> Dict[str, Any]:
+) -> Response:
     """
     Manually create user (for testing or when webhooks aren't working)
     
     This endpoint can be used during development or as a fallback
     """
     try:
-        user = clerk_user_service.create_or_update_user(clerk_user_data)
+        # Parse the raw body with orjson rather than going through FastAPI's body model
+        try:
+            clerk_user_data = orjson.loads(await request.body())
+        except orjson.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="Invalid JSON body")
+        if not isinstance(clerk_user_data, dict):
+            raise HTTPException(status_code=400, detail="Expected a JSON object")
+        
+        user = await clerk_user_service.create_or_update_user(clerk_user_data)
         
         if user:
-            return {
+            return ORJSONResponse({
                 "status": "success",
                 "message": "User created successfully",
                 "user": {
@@ -258,28 +286,31 @@ async def create_user_manually(
                     "email": user["email"],
                     "full_name": user["full_name"]
                 }
-            }
+            })
         else:
             raise HTTPException(status_code=400, detail="Failed to create user")
             
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error creating user manually: {str(e)}")
+        logger.error("Error creating user manually: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
+# Health check body never changes, so it's serialized once at import
+HEALTH_BODY = orjson.dumps({
+    "status": "healthy",
+    "service": "user_api",
+    "endpoints": [
+        "/api/user/profile",
+        "/api/user/stats",
+        "/api/user/conversations",
+        "/api/user/check-interview-limit",
+        "/api/user/start-interview"
+    ]
+})
+
 # Health check endpoint
-@user_router.get("/health")
+@user_router.get("/health", response_model=None)
 async def user_api_health():
     """Health check for user API"""
-    return {
-        "status": "healthy",
-        "service": "user_api",
-        "endpoints": [
-            "/api/user/profile",
-            "/api/user/stats",
-            "/api/user/conversations",
-            "/api/user/check-interview-limit",
-            "/api/user/start-interview"
-        ]
-    } 
\ No newline at end of file
+    return Response(content=HEALTH_BODY, media_type="application/json")
@@ -33,7 +33,7 @@ import {
   Bot
 } from "lucide-react"
 import Link from "next/link"
-import { UserButton, useUser } from "@clerk/nextjs"
+import { UserButton, useAuth, useUser } from "@clerk/nextjs"
 import { useEffect, useState } from "react"
 import { Input } from "@/components/ui/input"
 import { Label } from "@/components/ui/label"
@@ -73,6 +73,7 @@ interface TranscriptEntry {
 
 export default function Dashboard() {
   const { user, isLoaded } = useUser()
+  const { getToken } = useAuth()
   const [isUserSynced, setIsUserSynced] = useState(false)
   const [userStats, setUserStats] = useState<UserStats | null>(null)
   const [recentInterviews, setRecentInterviews] = useState<RecentInterview[]>([])
@@ -139,9 +140,11 @@ export default function Dashboard() {
         setIsLoadingStats(true)
         console.log('📊 Fetching user stats for:', user.id)
         
+        // Clerk session token - the backend verifies it and reads the user ID from it
+        const token = await getToken()
         const response = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/user/stats`, {
           headers: {
-            'Authorization': `Bearer ${user.id}`,
+            'Authorization': `Bearer ${token}`,
             'Content-Type': 'application/json',
           },
         })
@@ -179,7 +182,7 @@ export default function Dashboard() {
     }
 
     fetchUserStats()
-  }, [isLoaded, user, isUserSynced])
+  }, [isLoaded, user, isUserSynced, getToken])
 
   // Fetch recent interviews
   useEffect(() => {
@@ -190,9 +193,10 @@ export default function Dashboard() {
         setIsLoadingInterviews(true)
         console.log('📝 Fetching recent interviews for:', user.id)
         
+        const token = await getToken()
         const response = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/user/conversations?limit=5`, {
           headers: {
-            'Authorization': `Bearer ${user.id}`,
+            'Authorization': `Bearer ${token}`,
             'Content-Type': 'application/json',
           },
         })
@@ -214,7 +218,7 @@ export default function Dashboard() {
     }
 
     fetchRecentInterviews()
-  }, [isLoaded, user, isUserSynced])
+  }, [isLoaded, user, isUserSynced, getToken])
 
   // Helper function to format date
   const formatDate = (dateString: string) => {
@@ -306,9 +310,10 @@ export default function Dashboard() {
     try {
       console.log('📋 Fetching recent sessions for transcripts for:', user.id)
       
+      const token = await getToken()
       const response = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/user/conversations?limit=10`, {
         headers: {
-          'Authorization': `Bearer ${user.id}`,
+          'Authorization': `Bearer ${token}`,
           'Content-Type': 'application/json',
         },
       })
@@ -77,16 +77,6 @@ const base64ToArrayBuffer = (base64: string): ArrayBuffer => {
   return bytes.buffer
 }
 
-// Utility function to convert ArrayBuffer to base64
-const arrayBufferToBase64 = (buffer: ArrayBuffer): string => {
-  const bytes = new Uint8Array(buffer)
-  let binary = ''
-  for (let i = 0; i < bytes.byteLength; i++) {
-    binary += String.fromCharCode(bytes[i])
-  }
-  return window.btoa(binary)
-}
-
 export function useInterviewSession({ 
   prompt, 
   onEnd,
@@ -554,15 +544,9 @@ export function useInterviewSession({
             int16Array[i] = Math.max(-32768, Math.min(32767, inputData[i] * 32767))
           }
           
-          // Send base64 encoded PCM data to Supabase backend
+          // Send raw PCM as a binary frame - no base64 or JSON overhead
           if (wsRef.current?.readyState === WebSocket.OPEN) {
-            const audioBase64 = arrayBufferToBase64(int16Array.buffer)
-            wsRef.current.send(JSON.stringify({
-              type: 'audio_data',
-              data: {
-                audio: audioBase64
-              }
-            }))
+            wsRef.current.send(int16Array.buffer)
           }
         }
       }